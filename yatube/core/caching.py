@@ -0,0 +1,190 @@
+"""Кеширование страниц с «дырками» (hole punching).
+
+Страница рендерится один раз без пользовательских фрагментов — вместо
+них тег {% hole %} оставляет маркеры. Эта общая для всех «оболочка»
+кешируется, а фрагменты (шапка, переключатель лент) дорисовываются
+для каждого запроса, поэтому анонимные и авторизованные пользователи
+получают закешированную страницу, не видя чужого состояния.
+
+Ключ оболочки может включать счётчики поколений (get_versions): после
+записи обработчик сигнала увеличивает счётчик (bump_versions), и страница
+сразу собирается заново, поэтому оболочки можно хранить часами.
+
+Маркеры подписываются (django.core.signing): заполняются только
+маркеры, выведенные самой оболочкой, а не похожий на них текст
+пользователя в неэкранированном выводе.
+"""
+import hashlib
+import re
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+HOLE_RE = re.compile(rb'<!--hole:([A-Za-z0-9_.:-]+)-->')
+
+HOLE_SALT = 'core.caching.hole'
+
+SHELL_KEY = 'core:shell:{}'
+
+VERSION_KEY = 'core:version:{}'
+
+MODIFIED_KEY = 'core:modified:{}'
+
+
+def hole_marker(template_name, kwargs):
+    payload = signing.dumps([template_name, kwargs], salt=HOLE_SALT)
+    return mark_safe(f'<!--hole:{payload}-->')
+
+
+def fill_holes(content, request):
+    """Заполняет маркеры {% hole %}; маркеры с неверной подписью
+    остаются в ответе как есть."""
+    def render_hole(match):
+        try:
+            template_name, kwargs = signing.loads(
+                match.group(1).decode(), salt=HOLE_SALT
+            )
+        except (signing.BadSignature, ValueError):
+            return match.group(0)
+        return render_to_string(template_name, kwargs, request).encode()
+    return HOLE_RE.sub(render_hole, content)
+
+
+def cache_shell(timeout, key_func=None):
+    """Аналог cache_page, кеширующий страницу без фрагментов {% hole %}.
+
+    ``key_func(request, *args, **kwargs)`` возвращает дополнительные
+    части ключа (обычно счётчики поколений) или None, если страницу
+    для этого запроса кешировать нельзя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            parts = []
+            if key_func is not None:
+                parts = key_func(request, *args, **kwargs)
+            if parts is None:
+                return view(request, *args, **kwargs)
+            parts = [request.get_full_path(), *parts]
+            key = SHELL_KEY.format(hashlib.md5(
+                '|'.join(map(str, parts)).encode()
+            ).hexdigest())
+            shell = cache.get(key)
+            if shell is not None:
+                response = HttpResponse(shell['content'])
+                response['Content-Type'] = shell['content_type']
+            else:
+                request.punch_holes = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.punch_holes = False
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, {
+                        'content': response.content,
+                        'content_type': response['Content-Type'],
+                    }, timeout)
+            is_html = response['Content-Type'].startswith('text/html')
+            if is_html and not response.streaming:
+                response.content = fill_holes(response.content, request)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(scopes_func):
+    """ETag и Last-Modified для страницы по счётчикам поколений.
+
+    ``scopes_func(request, *args, **kwargs)`` возвращает области,
+    от которых зависит страница, или None, если валидаторы не нужны.
+    Валидаторы вычисляются до вызова представления: при совпадении
+    If-None-Match ответ 304 отдаётся без запросов к лентам и рендеринга.
+
+    В ETag входят пользователь и хеш CSRF-cookie — от них зависят
+    фрагменты {% hole %} и токены форм. Last-Modified отдаётся только
+    анонимам: по одной дате нельзя отличить копию страницы, полученную
+    до входа или выхода пользователя.
+    """
+    def get_scopes(request, *args, **kwargs):
+        if not hasattr(request, '_page_scopes'):
+            request._page_scopes = scopes_func(request, *args, **kwargs)
+        return request._page_scopes
+
+    def etag(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        parts = [
+            request.get_full_path(),
+            request.user.pk,
+            hashlib.md5(csrf_cookie.encode()).hexdigest(),
+            *get_versions(*scopes),
+        ]
+        return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        scopes = get_scopes(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        return get_last_modified(*scopes)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _initial_version():
+    # Начальное значение растёт со временем, поэтому после вытеснения
+    # счётчика из кеша старые ключи страниц не оживают.
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    """Текущие значения счётчиков поколений для областей ``scopes``."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    """Увеличивает счётчики поколений, делая закешированные страницы
+    этих областей недоступными, и запоминает время изменения."""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def get_last_modified(*scopes):
+    """Время последнего изменения областей ``scopes``; для областей,
+    которые ещё не менялись, отсчёт начинается с первого запроса."""
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    modified = cache.get_many(keys)
+    for key in keys:
+        if key not in modified:
+            cache.add(key, time.time(), None)
+            modified[key] = cache.get(key)
+    return datetime.fromtimestamp(
+        int(max(modified.values())), tz=timezone.utc
+    )
@@ -0,0 +1,98 @@
+"""Приём загруженных изображений с ограниченным расходом памяти.
+
+Размер и формат проверяются по заголовку файла до декодирования пикселей,
+JPEG декодируется сразу в уменьшенном масштабе (draft), остальные форматы
+допускаются, только пока число пикселей не больше IMAGE_MAX_PIXELS.
+Картинка уменьшается до IMAGE_MAX_SIDE по большей стороне, уже после
+этого поворачивается по EXIF (поворот копирует картинку целиком)
+и пересохраняется без метаданных.
+"""
+import math
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+}
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+KEEP_INFO = ('transparency',)
+
+
+def _open(upload):
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+    if image.format not in CONTENT_TYPES:
+        raise ValidationError(
+            'Поддерживаются изображения JPEG, PNG и GIF.',
+            code='invalid_format',
+        )
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: не больше %(limit)s пикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.IMAGE_MAX_PIXELS},
+        )
+    return image
+
+
+def draft(image, max_side):
+    """Просит JPEG-декодер уменьшить картинку, сохраняя пропорции, так,
+    чтобы большая сторона была не меньше ``max_side``."""
+    width, height = image.size
+    scale = min(max_side / max(width, height), 1)
+    image.draft(
+        'RGB', (math.ceil(width * scale), math.ceil(height * scale))
+    )
+
+
+def ingest(upload):
+    """Проверяет и пересохраняет загруженное изображение, возвращает
+    новый файл с тем же именем."""
+    image = _open(upload)
+    image_format = image.format
+    max_side = settings.IMAGE_MAX_SIDE
+    if getattr(image, 'is_animated', False):
+        if max(image.size) > max_side:
+            raise ValidationError(
+                'Анимация не должна быть больше %(limit)s пикселей '
+                'по большей стороне.',
+                code='animation_too_large',
+                params={'limit': max_side},
+            )
+        upload.seek(0)
+        return upload
+    draft(image, max_side)
+    image.thumbnail((max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEEP_INFO
+    }
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    return InMemoryUploadedFile(
+        buffer,
+        getattr(upload, 'field_name', None),
+        upload.name,
+        CONTENT_TYPES[image_format],
+        buffer.tell(),
+        None,
+    )
@@ -0,0 +1,67 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Имя файла — SHA-256 его содержимого, разложенный по подкаталогам
+(``posts/ab/cd/abcd...png``): одинаковые загрузки занимают один файл,
+а миниатюры sorl-thumbnail, которые привязаны к имени исходника,
+становятся общими для всех постов с этим файлом.
+"""
+import hashlib
+import os
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хешем в _save(), а совпадение имён
+        # означает совпадение содержимого, поэтому суффиксы не нужны.
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        name = os.path.join(
+            directory,
+            digest[:2],
+            digest[2:4],
+            digest + os.path.splitext(filename)[1].lower(),
+        )
+        if not self.exists(name):
+            self._create(name, content)
+        return name.replace('\\', '/')
+
+    def _create(self, name, content):
+        """Создаёт файл, если его нет. В отличие от FileSystemStorage
+        занятое имя не повод искать другое: файл с таким именем уже
+        содержит те же байты (например, от параллельной загрузки)."""
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                file_move_safe(content.temporary_file_path(), full_path)
+                self._chmod(full_path)
+                return
+            fd = os.open(full_path, self.OS_OPEN_FLAGS, 0o666)
+        except FileExistsError:
+            return
+        except OSError:
+            # file_move_safe сообщает о существующем файле обычным OSError.
+            if os.path.exists(full_path):
+                return
+            raise
+        with os.fdopen(fd, 'wb') as file:
+            for chunk in content.chunks():
+                file.write(chunk)
+        self._chmod(full_path)
+
+    def _chmod(self, full_path):
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
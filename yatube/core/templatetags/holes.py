@@ -0,0 +1,22 @@
+from django import template
+
+from core.caching import hole_marker
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **kwargs):
+    """Вставляет пользовательский фрагмент страницы.
+
+    Если страница рендерится для кеша (request.punch_holes), вместо
+    фрагмента выводится маркер, который cache_shell заполняет заново
+    на каждый запрос.
+    """
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return hole_marker(template_name, kwargs)
+    with context.push(**kwargs):
+        return context.template.engine.get_template(
+            template_name
+        ).render(context)
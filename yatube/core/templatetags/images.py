@@ -0,0 +1,15 @@
+from django import template
+
+from core.thumbnails import get_picture
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(image, variant, css_class=''):
+    """<picture> с srcset готовых миниатюр варианта, а пока их нет —
+    <img> с оригиналом."""
+    context = {'css_class': css_class}
+    if image:
+        context.update(get_picture(image, variant))
+    return context
@@ -1,4 +1,18 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.signals import request_finished
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import RequestFactory, TestCase
+
+from . import thumbnails
+from .caching import fill_holes, hole_marker
+from .storage import ContentAddressedStorage
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +20,68 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class FillHolesTest(TestCase):
+    def test_only_signed_markers_filled(self):
+        """Заполняются только подписанные маркеры, а поддельные
+        и испорченные остаются текстом без ошибки."""
+        request = RequestFactory().get('/')
+        signed = hole_marker('core/404.html', {}).encode()
+        forged = [
+            b'<!--hole:AAAA-->',
+            b'<!--hole:' + base64.urlsafe_b64encode(
+                b'["core/404.html", {}]'
+            ) + b'-->',
+            signed.replace(b'<!--hole:', b'<!--hole:x'),
+        ]
+        content = fill_holes(b'|'.join([signed, *forged]), request)
+        self.assertNotIn(signed, content)
+        self.assertTrue(content.endswith(b'|'.join([b'', *forged])))
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_concurrent_identical_save(self):
+        """Если файл появился после проверки exists(), сохранение
+        возвращает имя по хешу, а не ищет новое бесконечно."""
+        name = self.storage.save('posts/a.txt', ContentFile(b'data'))
+        uploads = [
+            ContentFile(b'data'),
+            TemporaryUploadedFile('b.txt', 'text/plain', 4, None),
+        ]
+        uploads[1].write(b'data')
+        uploads[1].seek(0)
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            for upload in uploads:
+                with self.subTest(upload=type(upload).__name__):
+                    self.assertEqual(
+                        self.storage.save('posts/b.txt', upload), name
+                    )
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.storage.path(name))),
+            [os.path.basename(name)],
+        )
+
+
+class GenerateAfterResponseTest(TestCase):
+    def test_only_originating_thread_generates(self):
+        """Миниатюры создаёт только поток, поставивший их в очередь,
+        а не первый завершившийся запрос любого потока."""
+        image = mock.Mock()
+        with mock.patch.object(thumbnails, 'generate') as generate:
+            thread = threading.Thread(
+                target=thumbnails._generate_after_response, args=[image]
+            )
+            thread.start()
+            thread.join()
+            request_finished.send(sender=self.__class__)
+            generate.assert_not_called()
+            thumbnails._generate_after_response(image)
+            request_finished.send(sender=self.__class__)
+            request_finished.send(sender=self.__class__)
+        generate.assert_called_once_with(image)
@@ -0,0 +1,266 @@
+"""Предварительная генерация миниатюр изображений.
+
+Миниатюры всех вариантов из настройки THUMBNAIL_VARIANTS создаются
+после сохранения изображения, а не при первом рендеринге страницы:
+в пуле фоновых потоков или, если пул выключен, сразу после отправки
+ответа на запрос загрузки. Шаблоны только ищут готовую миниатюру
+в key-value хранилище sorl-thumbnail и, пока её нет, показывают оригинал;
+для ленты миниатюры всей страницы читаются одним пакетным запросом
+(prefetch_thumbnails). Каждый вариант создаётся в нескольких ширинах
+и форматах для <picture> и srcset (get_picture).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = threading.local()
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Backend sorl-thumbnail, умеющий искать миниатюру без генерации."""
+
+    def get_options(self, source, options):
+        """Опции с теми же значениями по умолчанию, что и в
+        get_thumbnail(), чтобы имя миниатюры совпадало."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры с тем же именем, что у get_thumbnail(),
+        без обращения к хранилищам."""
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.get_options(source, options)
+        )
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра из key-value хранилища или None."""
+        return default.kvstore.get(
+            self.get_thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Key-value хранилище sorl-thumbnail с пакетным чтением."""
+
+    def get_many(self, image_files):
+        """Записи для списка файлов (None для отсутствующих): один
+        cache.get_many() и не больше одного запроса к БД."""
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            fetched = {
+                key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            values.update(fetched)
+        return [
+            None if values[key] == cached_db_kvstore.EMPTY_VALUE
+            else deserialize_image_file(values[key])
+            for key in keys
+        ]
+
+
+def get_formats():
+    """Дополнительные форматы из THUMBNAIL_FORMATS, которые умеют
+    сохранять и Pillow, и sorl-thumbnail."""
+    Image.init()
+    return [
+        image_format for image_format in settings.THUMBNAIL_FORMATS
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+    ]
+
+
+def _scale_geometry(geometry, width):
+    base_width, _, height = geometry.partition('x')
+    if not height:
+        return str(width)
+    return f'{width}x{round(int(height) * width / int(base_width))}'
+
+
+def get_renditions(variant):
+    """Версии варианта из THUMBNAIL_VARIANTS: (ширина, формат, геометрия,
+    опции) для его ширины и меньших ширин из THUMBNAIL_WIDTHS, в исходном
+    формате (None) и в дополнительных форматах."""
+    geometry, options = settings.THUMBNAIL_VARIANTS[variant]
+    base_width = int(geometry.partition('x')[0])
+    widths = sorted(
+        {width for width in settings.THUMBNAIL_WIDTHS if width < base_width}
+        | {base_width}
+    )
+    renditions = []
+    for image_format in [None, *get_formats()]:
+        format_options = dict(options)
+        if image_format is not None:
+            format_options['format'] = image_format
+        renditions += [
+            (width, image_format, _scale_geometry(geometry, width),
+             format_options)
+            for width in widths
+        ]
+    return renditions
+
+
+def prefetch_thumbnails(images):
+    """Загружает готовые миниатюры всех вариантов для списка изображений
+    одним пакетным чтением key-value хранилища; get_picture() затем
+    берёт их без обращений к кешу и БД."""
+    images = [image for image in images if image]
+    if not images:
+        return
+    renditions = [
+        (variant, width, image_format, geometry, options)
+        for variant in settings.THUMBNAIL_VARIANTS
+        for width, image_format, geometry, options in get_renditions(variant)
+    ]
+    files = [
+        (image, (variant, width, image_format),
+         default.backend.get_thumbnail_file(image, geometry, **options))
+        for image in images
+        for variant, width, image_format, geometry, options in renditions
+    ]
+    thumbnails = default.kvstore.get_many([file_ for _, _, file_ in files])
+    for image in images:
+        image.prefetched_thumbnails = {}
+    for (image, key, _), thumbnail in zip(files, thumbnails):
+        image.prefetched_thumbnails[key] = thumbnail
+
+
+def _get_thumbnails(image, variant):
+    if not hasattr(image, 'prefetched_thumbnails'):
+        prefetch_thumbnails([image])
+    return [
+        (image_format, image.prefetched_thumbnails.get(
+            (variant, width, image_format)
+        ))
+        for width, image_format, _, _ in get_renditions(variant)
+    ]
+
+
+def _srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {thumbnail.x}w' for thumbnail in thumbnails
+    )
+
+
+def get_picture(image, variant):
+    """Данные для <picture>: src, srcset, sizes и размеры <img>
+    и <source> дополнительных форматов. Пока миниатюр нет, src —
+    оригинал без srcset."""
+    ready = {}
+    for image_format, thumbnail in _get_thumbnails(image, variant):
+        if thumbnail:
+            ready.setdefault(image_format, []).append(thumbnail)
+    if None not in ready:
+        return {'src': image.url}
+    largest = ready[None][-1]
+    return {
+        'src': largest.url,
+        'srcset': _srcset(ready[None]),
+        'sizes': f'(max-width: {largest.x}px) 100vw, {largest.x}px',
+        'width': largest.x,
+        'height': largest.y,
+        'sources': [
+            {
+                'type': f'image/{image_format.lower()}',
+                'srcset': _srcset(ready[image_format]),
+            }
+            for image_format in get_formats() if image_format in ready
+        ],
+    }
+
+
+def generate(image):
+    """Создаёт миниатюры всех версий всех вариантов для изображения."""
+    for variant in settings.THUMBNAIL_VARIANTS:
+        for _, _, geometry, options in get_renditions(variant):
+            try:
+                default.backend.get_thumbnail(image, geometry, **options)
+            except Exception:
+                logger.exception(
+                    'Не удалось создать миниатюру %s', image.name
+                )
+
+
+def _generate_in_worker(image):
+    try:
+        generate(image)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _generate_after_response(image):
+    _pending.__dict__.setdefault('images', []).append(image)
+
+
+def _generate_pending(**kwargs):
+    """Создаёт миниатюры, поставленные в очередь в этом потоке:
+    request_finished отправляется из close() ответа в том же потоке,
+    поэтому работа достаётся только запросу, загрузившему изображение."""
+    images = _pending.__dict__.pop('images', ())
+    for image in images:
+        generate(image)
+
+
+request_finished.connect(_generate_pending)
+
+
+def pregenerate(image):
+    """Ставит генерацию миниатюр в очередь после фиксации транзакции.
+
+    При THUMBNAIL_WORKERS > 0 миниатюры создаются в пуле потоков,
+    иначе — в потоке запроса после отправки ответа (request_finished).
+    """
+    if not image:
+        return
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_generate_in_worker, image)
+        )
+    else:
+        transaction.on_commit(lambda: _generate_after_response(image))
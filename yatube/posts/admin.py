@@ -1,5 +1,7 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -8,7 +10,8 @@ class GroupAdmin(admin.ModelAdmin):
         'pk',
         'title',
         'slug',
-        'description',)
+        'description',
+        'posts_count',)
     empty_value_display = '-пусто-'
 
 
@@ -19,12 +22,28 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'comments_count',
     )
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через поисковый индекс, а не LIKE по таблице;
+        индекс отдаёт не больше SEARCH_MAX_RESULTS постов."""
+        if not search_term:
+            return queryset, False
+        ids = search.search_ids(search_term)
+        if len(ids) >= settings.SEARCH_MAX_RESULTS:
+            self.message_user(
+                request,
+                f'Показаны только первые {len(ids)} найденных постов, '
+                f'уточните запрос.',
+                messages.WARNING,
+            )
+        return queryset.filter(pk__in=ids), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("text", "author", "created")
@@ -0,0 +1,150 @@
+"""JSON API лент и постов только для чтения.
+
+Посты выбираются через ``.values()`` без создания объектов моделей,
+``?fields=`` ограничивает набор полей (и JOIN-ов), листание — по курсору
+``?cursor=`` без COUNT(*).
+
+ETag и Last-Modified вычисляются по счётчикам поколений тех же областей,
+что и у HTML-страниц, ещё до вызова представления, поэтому на запрос
+с актуальными If-None-Match/If-Modified-Since сразу отдаётся 304
+без обращения к таблице постов.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from core.caching import get_last_modified, get_versions
+
+from . import lookups
+from .models import Post
+from .utils import POSTS_PER_PAGE, CursorPaginator
+
+FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+
+# Поля, которые выбираются всегда: по ним строится курсор.
+CURSOR_FIELDS = ('pk', 'pub_date')
+
+API_VERSION = 1
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def get_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(FIELDS)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(FIELDS))
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def serialize(row, fields):
+    data = {field: row[FIELDS[field]] for field in fields}
+    if 'image' in data:
+        data['image'] = (
+            Post._meta.get_field('image').storage.url(data['image'])
+            if data['image'] else None
+        )
+    return data
+
+
+def select(posts, fields):
+    paths = {FIELDS[field] for field in fields}
+    return posts.values(*CURSOR_FIELDS, *sorted(paths - set(CURSOR_FIELDS)))
+
+
+def page_url(request, cursor):
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(
+        f'{request.path}?{urlencode(sorted(query.items()))}'
+    )
+
+
+def feed_response(request, posts):
+    fields = get_fields(request)
+    paginator = CursorPaginator(
+        select(posts, fields), POSTS_PER_PAGE, count=lambda: None
+    )
+    cursor = request.GET.get('cursor')
+    try:
+        page = paginator.cursor_page(cursor) if cursor else paginator.page(1)
+    except InvalidPage:
+        raise Http404('Некорректный курсор')
+    return JsonResponse({
+        'results': [serialize(row, fields) for row in page],
+        'next': (
+            page_url(request, page.next_cursor) if page.has_next() else None
+        ),
+        'previous': (
+            page_url(request, page.previous_cursor)
+            if page.has_previous() else None
+        ),
+    })
+
+
+def api_view(scopes):
+    """Представление API: только GET/HEAD, ошибки полей — 400,
+    валидаторы ответа — по счётчикам поколений ``scopes(**kwargs)``."""
+    def etag(request, **kwargs):
+        versions = get_versions(*scopes(**kwargs))
+        return hashlib.md5('|'.join(map(str, [
+            API_VERSION, request.get_full_path(), *versions
+        ])).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return get_last_modified(*scopes(**kwargs))
+
+    def decorator(view):
+        @require_safe
+        @condition(etag_func=etag, last_modified_func=last_modified)
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            try:
+                return view(request, **kwargs)
+            except FieldsError as error:
+                return JsonResponse({'detail': str(error)}, status=400)
+        return wrapper
+    return decorator
+
+
+@api_view(lambda: ['posts', 'groups', 'authors'])
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view(lambda slug: [f'group:{slug}', 'groups', 'authors'])
+def group_posts(request, slug):
+    group = lookups.get_group_or_404(slug)
+    return feed_response(request, Post.objects.filter(group_id=group.pk))
+
+
+@api_view(lambda username: [f'author:{username}', 'groups'])
+def profile(request, username):
+    author = lookups.get_author_or_404(username)
+    return feed_response(request, Post.objects.filter(author_id=author.pk))
+
+
+@api_view(lambda post_id: [f'post:{post_id}', 'groups', 'authors'])
+def post_detail(request, post_id):
+    fields = get_fields(request)
+    row = select(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        raise Http404('Пост не найден')
+    return JsonResponse(serialize(row, fields))
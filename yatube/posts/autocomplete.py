@@ -0,0 +1,116 @@
+"""Автодополнение авторов по началу имени пользователя или полного имени.
+
+Индекс — отсортированный список пар (ключ, id пользователя) в памяти
+процесса: префиксный запрос — это bisect до первого подходящего ключа
+и проход вперёд, без обращений к БД. Индекс строится при первом запросе,
+а дальше обновляется сигналами сохранения и удаления пользователей
+в этом процессе.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import User
+
+
+def _keys(username, full_name):
+    words = full_name.lower().split()
+    return {
+        username.lower(),
+        *(' '.join(words[i:]) for i in range(len(words))),
+    }
+
+
+class AuthorIndex:
+    def __init__(self):
+        self.keys = []
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def _remove(self, pk):
+        user = self.users.pop(pk, None)
+        if user is None:
+            return
+        for key in user['keys']:
+            position = bisect_left(self.keys, (key, pk))
+            if position < len(self.keys) and self.keys[position] == (key, pk):
+                del self.keys[position]
+
+    def add(self, pk, username, full_name):
+        keys = _keys(username, full_name)
+        with self.lock:
+            self._remove(pk)
+            self.users[pk] = {
+                'username': username,
+                'full_name': full_name,
+                'keys': keys,
+            }
+            for key in keys:
+                insort(self.keys, (key, pk))
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove(pk)
+
+    def complete(self, prefix, limit):
+        prefix = prefix.lower()
+        found = []
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            while len(found) < limit and position < len(self.keys):
+                key, pk = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if pk not in found:
+                    found.append(pk)
+                position += 1
+            return [self.users[pk] for pk in found]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = AuthorIndex()
+            for user in User.objects.filter(is_active=True).only(
+                'username', 'first_name', 'last_name'
+            ).iterator():
+                index.add(user.pk, user.username, user.get_full_name())
+            _index = index
+    return _index
+
+
+def update_user(user):
+    if _index is None:
+        return
+    if user.is_active:
+        _index.add(user.pk, user.username, user.get_full_name())
+    else:
+        _index.remove(user.pk)
+
+
+def remove_user(user_id):
+    if _index is not None:
+        _index.remove(user_id)
+
+
+def complete(query):
+    """Не больше AUTOCOMPLETE_LIMIT авторов, у которых имя пользователя
+    или полное имя (целиком или с любого слова) начинается с query."""
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    return [
+        {
+            'username': user['username'],
+            'full_name': user['full_name'],
+            'url': reverse('posts:profile', args=[user['username']]),
+        }
+        for user in _get_index().complete(query, settings.AUTOCOMPLETE_LIMIT)
+    ]
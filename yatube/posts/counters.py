@@ -0,0 +1,118 @@
+"""Денормализованные счётчики постов, комментариев и подписок
+и счётчики ссылок на файлы картинок.
+
+Счётчики меняются атомарно через F()-выражения в обработчиках сигналов,
+а reconcile() пересчитывает их пакетно и исправляет накопившийся дрейф.
+"""
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from sorl.thumbnail import delete as delete_with_thumbnails
+
+from .models import (AuthorStats, Comment, Follow, Group, Post, StoredFile,
+                     User)
+
+logger = logging.getLogger(__name__)
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_author_stats(user_id, field, delta):
+    _change(AuthorStats.objects.filter(user_id=user_id), field, delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def retain_file(name):
+    if name:
+        StoredFile.objects.get_or_create(name=name)
+        _change(StoredFile.objects.filter(name=name), 'references', 1)
+
+
+def release_file(image):
+    """Уменьшает число ссылок на файл и после фиксации транзакции
+    удаляет его, если ссылок не осталось."""
+    if image:
+        _change(StoredFile.objects.filter(name=image.name), 'references', -1)
+        transaction.on_commit(lambda: collect_file(image))
+
+
+def collect_file(image):
+    """Удаляет файл вместе с миниатюрами, если на него нет ссылок."""
+    deleted, _ = StoredFile.objects.filter(
+        name=image.name, references=0
+    ).delete()
+    if not deleted:
+        return
+    try:
+        delete_with_thumbnails(image)
+    except (OSError, SuspiciousFileOperation):
+        logger.exception('Не удалось удалить файл %s', image.name)
+
+
+def _recount(model, field, related, related_field):
+    actual = Coalesce(
+        Subquery(
+            related.objects.filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+    stale = model.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}
+    )
+    return model.objects.filter(pk__in=stale.values('pk')).update(
+        **{field: actual}
+    )
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)
+    )
+    StoredFile.objects.bulk_create(
+        (
+            StoredFile(name=name) for name in Post.objects.exclude(
+                image=''
+            ).exclude(
+                image__in=StoredFile.objects.values('name')
+            ).order_by().values_list('image', flat=True).distinct()
+        ),
+        ignore_conflicts=True,
+    )
+    return {
+        'group.posts_count': _recount(Group, 'posts_count', Post, 'group'),
+        'post.comments_count': _recount(
+            Post, 'comments_count', Comment, 'post'
+        ),
+        'stats.posts_count': _recount(
+            AuthorStats, 'posts_count', Post, 'author'
+        ),
+        'stats.followers_count': _recount(
+            AuthorStats, 'followers_count', Follow, 'author'
+        ),
+        'stats.following_count': _recount(
+            AuthorStats, 'following_count', Follow, 'user'
+        ),
+        'file.references': _recount(StoredFile, 'references', Post, 'image'),
+    }
@@ -0,0 +1,201 @@
+"""RSS и Atom ленты главной страницы, сообществ и авторов.
+
+Лента содержит FEED_ITEMS последних постов, выбранных одним запросом
+с select_related, и отдаётся потоком: заголовок канала, затем посты по
+одному по мере чтения курсора. Готовый документ кешируется под ключом
+со счётчиками поколений областей ленты, поэтому повторный опрос стоит
+одного обращения к кешу, а с If-None-Match — ответа 304.
+"""
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views.decorators.http import condition
+
+from core.caching import get_last_modified, get_versions
+
+from . import lookups
+from .models import Post
+
+FEED_KEY = 'posts:feed:{}'
+
+ITEMS_MARKER = '<!--items-->'
+
+TITLE_WORDS = 10
+
+
+class StreamingFeedMixin:
+    """Генератор ленты, который пишет посты по одному, а не из
+    заранее собранного списка ``items``."""
+
+    item_element = None
+
+    def __init__(self, *args, latest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latest = latest
+
+    def latest_post_date(self):
+        return self.latest or super().latest_post_date()
+
+    def write_items(self, handler):
+        handler.ignorableWhitespace(ITEMS_MARKER)
+
+    def stream(self, items, encoding='utf-8'):
+        """Куски документа: заголовок, каждый элемент ``items``
+        (аргументы add_item) и окончание."""
+        document = io.StringIO()
+        self.write(document, encoding)
+        head, tail = document.getvalue().split(ITEMS_MARKER)
+        yield head
+        for kwargs in items:
+            self.add_item(**kwargs)
+            item = self.items.pop()
+            chunk = io.StringIO()
+            handler = SimplerXMLGenerator(chunk, encoding)
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield chunk.getvalue()
+        yield tail
+
+
+class RssFeed(StreamingFeedMixin, feedgenerator.Rss201rev2Feed):
+    item_element = 'item'
+
+
+class AtomFeed(StreamingFeedMixin, feedgenerator.Atom1Feed):
+    item_element = 'entry'
+
+
+FORMATS = {
+    'rss': RssFeed,
+    'atom': AtomFeed,
+}
+
+
+def post_item(request, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.pk])
+    )
+    return {
+        'title': Truncator(post.text).words(TITLE_WORDS),
+        'link': link,
+        'unique_id': link,
+        'description': post.text,
+        'pubdate': post.pub_date,
+        'author_name': (
+            post.author.get_full_name() or post.author.username
+        ),
+        'categories': [post.group.title] if post.group else (),
+    }
+
+
+def feed_response(request, posts, title, link, scopes):
+    """Ответ с лентой последних постов ``posts``, из кеша или потоком
+    с записью в кеш после отправки последнего куска."""
+    feed_format = request.GET.get('format', 'rss')
+    feed_class = FORMATS.get(feed_format, RssFeed)
+    key = FEED_KEY.format(hashlib.md5('|'.join(map(str, [
+        request.build_absolute_uri(), feed_format, *get_versions(*scopes)
+    ])).encode()).hexdigest())
+    content_type = feed_class.content_type
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type=content_type)
+    posts = iter(posts.select_related('author', 'group').order_by(
+        '-pub_date', '-pk'
+    )[:settings.FEED_ITEMS].iterator())
+    first = next(posts, None)
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=title,
+        feed_url=request.build_absolute_uri(),
+        language='ru',
+        latest=first.pub_date if first else None,
+    )
+
+    def items():
+        if first is not None:
+            yield post_item(request, first)
+            for post in posts:
+                yield post_item(request, post)
+
+    def stream():
+        chunks = []
+        for chunk in feed.stream(items()):
+            chunk = chunk.encode()
+            chunks.append(chunk)
+            yield chunk
+        cache.set(key, b''.join(chunks), settings.PAGE_CACHE_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type=content_type)
+
+
+def feed_view(scopes_func):
+    """Лента с валидаторами ETag и Last-Modified по областям
+    ``scopes_func(**kwargs)``; читатели лент приходят без cookie,
+    поэтому пользователь в ETag не учитывается."""
+    def etag(request, **kwargs):
+        versions = get_versions(*scopes_func(**kwargs))
+        return hashlib.md5('|'.join(map(str, [
+            request.get_full_path(), *versions
+        ])).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return get_last_modified(*scopes_func(**kwargs))
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def index_scopes():
+    return ['posts', 'groups', 'authors']
+
+
+def group_scopes(slug):
+    return [f'group:{slug}', 'groups', 'authors']
+
+
+def profile_scopes(username):
+    return [f'author:{username}', 'groups']
+
+
+@feed_view(index_scopes)
+def index(request):
+    return feed_response(
+        request,
+        Post.objects.all(),
+        'Последние обновления на сайте',
+        reverse('posts:index'),
+        index_scopes(),
+    )
+
+
+@feed_view(group_scopes)
+def group_posts(request, slug):
+    group = lookups.get_group_or_404(slug)
+    return feed_response(
+        request,
+        Post.objects.filter(group_id=group.pk),
+        f'Записи сообщества {group.title}',
+        reverse('posts:group_list', args=[slug]),
+        group_scopes(slug),
+    )
+
+
+@feed_view(profile_scopes)
+def profile(request, username):
+    author = lookups.get_author_or_404(username)
+    return feed_response(
+        request,
+        Post.objects.filter(author_id=author.pk),
+        f'Все посты пользователя {author.get_full_name() or username}',
+        reverse('posts:profile', args=[username]),
+        profile_scopes(username),
+    )
@@ -0,0 +1,32 @@
+"""Множество id авторов, на которых подписан пользователь.
+
+Множество кешируется целиком и сбрасывается сигналами при подписке
+и отписке, так что проверка подписки на любое число авторов стоит
+не больше одного запроса к кешу на запрос пользователя.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWING_KEY = 'posts:following:{}'
+
+
+def get_following(user):
+    if not user.is_authenticated:
+        return frozenset()
+    following = getattr(user, '_following_ids', None)
+    if following is None:
+        key = FOLLOWING_KEY.format(user.pk)
+        following = cache.get(key)
+        if following is None:
+            following = frozenset(Follow.objects.filter(
+                user_id=user.pk
+            ).values_list('author_id', flat=True))
+            cache.set(key, following, settings.OBJECT_CACHE_TIMEOUT)
+        user._following_ids = following
+    return following
+
+
+def invalidate(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
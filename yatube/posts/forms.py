@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from core.images import ingest
 
 from .models import Comment, Post
 
@@ -18,6 +21,12 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка нового поста',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return ingest(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
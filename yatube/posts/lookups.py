@@ -0,0 +1,50 @@
+"""Кешированный поиск сообществ по slug и авторов по username.
+
+Объект кешируется под счётчиком поколения своей области из versions
+(``group:<slug>``, ``author:<username>``): он сбрасывается при любом
+изменении объекта, его переименовании и удалении, а также при изменении
+денормализованных счётчиков, которые хранятся вместе с ним. Отсутствие
+объекта тоже кешируется, но на OBJECT_CACHE_MISS_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core.caching import get_versions
+
+from .models import Group, User
+
+OBJECT_KEY = 'posts:object:{}:{}'
+
+MISSING = 'missing'
+
+
+def _get_or_404(queryset, scope, **lookup):
+    key = OBJECT_KEY.format(scope, *get_versions(scope))
+    obj = cache.get(key)
+    if obj is None:
+        obj = queryset.filter(**lookup).first()
+        if obj is None:
+            cache.set(key, MISSING, settings.OBJECT_CACHE_MISS_TIMEOUT)
+        else:
+            cache.set(key, obj, settings.OBJECT_CACHE_TIMEOUT)
+    if obj is None or obj == MISSING:
+        raise Http404(f'{queryset.model._meta.object_name} не найден')
+    return obj
+
+
+def get_group_or_404(slug):
+    return _get_or_404(Group.objects.all(), f'group:{slug}', slug=slug)
+
+
+def get_author_or_404(username):
+    """Пользователь вместе со статистикой автора (stats); из полей
+    пользователя в общий кеш попадают только выводимые на страницах,
+    без пароля, почты и дат входа."""
+    return _get_or_404(
+        User.objects.select_related('stats').only(
+            'username', 'first_name', 'last_name'
+        ),
+        f'author:{username}',
+        username=username,
+    )
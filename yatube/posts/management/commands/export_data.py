@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts import exports
+
+
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Некорректная дата --since: {value}')
+        since = datetime.combine(date, datetime.min.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f'Что выгружать: {", ".join(exports.EXPORTS)} '
+                 f'(по умолчанию всё)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(exports.WRITERS),
+            default=exports.FORMAT_NDJSON,
+        )
+        parser.add_argument('--output-dir', default='.')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать файлы gzip'
+        )
+        parser.add_argument(
+            '--since',
+            type=parse_since,
+            help='Только записи с датой не раньше заданной (ISO 8601)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exports.CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(exports.EXPORTS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные выгрузки: {", ".join(sorted(unknown))}'
+            )
+        os.makedirs(options['output_dir'], exist_ok=True)
+        suffix = '.gz' if options['gzip'] else ''
+        for name in options['names'] or exports.EXPORTS:
+            path = os.path.join(
+                options['output_dir'],
+                f'{name}.{options["format"]}{suffix}',
+            )
+            started = time.monotonic()
+            with exports.open_output(path, options['gzip']) as outfile:
+                rows = exports.export(
+                    name,
+                    outfile,
+                    options['format'],
+                    since=options['since'],
+                    chunk_size=options['chunk_size'],
+                )
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{name}: {rows} строк за {elapsed:.1f} с '
+                f'({rows / elapsed if elapsed else 0:.0f} строк/с) -> {path}'
+            )
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def handle(self, *args, **options):
+        timelines.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов по графу подписок'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = suggestions.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {total} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_suggestions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='suggestion',
+            name='suggestion_user_score_idx',
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['user', '-score', 'author'], name='suggestion_user_score_idx'),
+        ),
+    ]
@@ -0,0 +1,201 @@
+"""Полнотекстовый поиск по текстам постов.
+
+Основной движок — виртуальная таблица SQLite FTS5 ``posts_search``
+(rowid = id поста), которую заполняет миграция и обновляют сигналы
+сохранения и удаления постов; результаты ранжируются по bm25.
+Если FTS5 недоступна (другая СУБД или SQLite без FTS5) или выбрана
+настройкой SEARCH_ENGINE = 'python', используется инвертированный индекс
+в памяти процесса: он строится при первом запросе, дальше обновляется
+сигналами этого процесса, а результаты ранжируются по TF-IDF.
+
+Запрос разбивается на слова, каждое ищется как префикс, все слова
+должны встретиться в тексте.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+ENGINE_FTS5 = 'fts5'
+ENGINE_PYTHON = 'python'
+
+TABLE = 'posts_search'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+_fts_databases = {}
+
+
+def uses_fts():
+    if settings.SEARCH_ENGINE != ENGINE_FTS5:
+        return False
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_databases:
+        _fts_databases[name] = (
+            TABLE in connection.introspection.table_names()
+        )
+    return _fts_databases[name]
+
+
+class InvertedIndex:
+    """Инвертированный индекс: слово -> {id поста: число вхождений}.
+
+    Слова индекса хранятся и в отсортированном списке ``tokens``,
+    поэтому слова с нужным префиксом находятся через bisect."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.tokens = []
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, rows):
+        """Индекс по парам (id поста, текст); список слов сортируется
+        один раз, а не вставкой каждого нового слова."""
+        index = cls()
+        for pk, text in rows:
+            index._add(pk, Counter(tokenize(text)))
+        index.tokens = sorted(index.postings)
+        return index
+
+    def _add(self, pk, counts):
+        self.documents[pk] = set(counts)
+        for token, count in counts.items():
+            self.postings[token][pk] = count
+
+    def _remove(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+
+    def add(self, pk, text):
+        counts = Counter(tokenize(text))
+        with self.lock:
+            self._remove(pk)
+            for token in counts:
+                if token not in self.postings:
+                    insort(self.tokens, token)
+            self._add(pk, counts)
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove(pk)
+
+    def search(self, terms, limit):
+        """id постов, содержащих префиксы всех ``terms``, от лучших
+        к худшим по TF-IDF."""
+        with self.lock:
+            total = len(self.documents) or 1
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                position = bisect_left(self.tokens, term)
+                while position < len(self.tokens):
+                    token = self.tokens[position]
+                    if not token.startswith(term):
+                        break
+                    postings = self.postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for pk, count in postings.items():
+                        term_scores[pk] += count * idf
+                    position += 1
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        pk: score + term_scores[pk]
+                        for pk, score in scores.items() if pk in term_scores
+                    }
+        ranked = sorted(
+            (scores or {}).items(), key=lambda item: (-item[1], -item[0])
+        )
+        return [pk for pk, _ in ranked[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = InvertedIndex.build(
+                Post.objects.values_list('pk', 'text').iterator()
+            )
+    return _index
+
+
+def index_post(post):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+    elif _index is not None:
+        _index.add(post.pk, post.text)
+
+
+def unindex_post(post_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+    elif _index is not None:
+        _index.remove(post_id)
+
+
+def search_ids(query):
+    """id найденных постов от более к менее релевантным,
+    не больше SEARCH_MAX_RESULTS."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    limit = settings.SEARCH_MAX_RESULTS
+    if not uses_fts():
+        return _get_index().search(terms, limit)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s',
+            [match, limit],
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def highlight(text, query):
+    """Текст с найденными словами в <mark>, остальное экранировано."""
+    terms = tuple(tokenize(query))
+    if not terms:
+        return escape(text)
+    parts = []
+    position = 0
+    for word in WORD_RE.finditer(text):
+        if not word.group().lower().startswith(terms):
+            continue
+        parts.append(escape(text[position:word.start()]))
+        parts.append(f'<mark>{escape(word.group())}</mark>')
+        position = word.end()
+    parts.append(escape(text[position:]))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,191 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (autocomplete, counters, following, search, timelines,
+               versions)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, **kwargs):
+    if not instance._state.adding:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if previous is not None:
+            instance._previous_group_id, image = previous
+            instance._previous_image = Post(image=image).image
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, 'posts_count', 1)
+        counters.change_group_posts(instance.group_id, 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.change_group_posts(previous_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, 'posts_count', -1)
+    counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post_image(sender, instance, created, **kwargs):
+    previous_image = getattr(instance, '_previous_image', None)
+    if created or previous_image != instance.image:
+        counters.retain_file(instance.image.name)
+        counters.release_file(previous_image)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post_image(sender, instance, **kwargs):
+    counters.release_file(instance.image)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, 'followers_count', 1)
+        counters.change_author_stats(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, 'followers_count', -1)
+    counters.change_author_stats(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if timelines.uses_inbox():
+        versions.bump_feeds(timelines.fan_out_post(instance))
+    else:
+        timelines.invalidate_author_timeline(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def drop_from_follow_feeds(sender, instance, **kwargs):
+    # Записи FeedEntry удаляются каскадом без сигналов, поэтому число
+    # постов в лентах подписчиков сбрасывается здесь.
+    if timelines.uses_inbox():
+        versions.bump_feeds(timelines.follower_ids(instance.author_id))
+    else:
+        timelines.invalidate_author_timeline(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follow_feed(sender, instance, created, **kwargs):
+    if created and timelines.uses_inbox():
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follow_feed(sender, instance, **kwargs):
+    if timelines.uses_inbox():
+        timelines.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def bump_saved_post_versions(sender, instance, **kwargs):
+    versions.bump_post(
+        instance.pk,
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_previous_group_id', None),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_versions(sender, instance, **kwargs):
+    versions.bump_post(instance.pk, instance.author_id, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_versions(sender, instance, **kwargs):
+    versions.bump_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_versions(sender, instance, **kwargs):
+    versions.bump_follow(instance)
+    following.invalidate(instance.user_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_previous_slug(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_versions(sender, instance, **kwargs):
+    versions.bump_group(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_names(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields is not None and not (
+        set(update_fields) & set(versions.AUTHOR_NAME_FIELDS)
+    ):
+        return
+    instance._previous_names = User.objects.filter(
+        pk=instance.pk
+    ).values(*versions.AUTHOR_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_author_versions(sender, instance, **kwargs):
+    versions.bump_author(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def autocomplete_saved_user(sender, instance, **kwargs):
+    autocomplete.update_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def autocomplete_deleted_user(sender, instance, **kwargs):
+    autocomplete.remove_user(instance.pk)
@@ -0,0 +1,221 @@
+"""Рекомендации авторов для подписки («кого почитать»).
+
+Граф подписок целиком загружается из Follow в два CSR-представления
+на массивах NumPy: ``following`` (пользователь -> авторы) и ``followers``
+(автор -> подписчики). Для блока пользователей соседи собираются
+векторно, без цикла по пользователям:
+
+* друзья друзей — авторы, на которых подписаны авторы пользователя
+  (два шага по ``following``);
+* совместные подписки — авторы, на которых подписаны другие подписчики
+  авторов пользователя (шаг по ``followers`` и шаг по ``following``).
+
+Пары (пользователь, кандидат) кодируются одним int64, веса складываются
+через np.unique + np.bincount, это эквивалент произведения разреженных
+матриц. Уже читаемые авторы и сам пользователь отбрасываются, лучшие
+SUGGESTIONS_STORED кандидатов сохраняются в таблицу Suggestion, из
+которой рекомендации показываются на страницах.
+
+Число соседей, которые берутся у одной вершины, ограничено
+SUGGESTIONS_FANOUT_LIMIT, поэтому популярные авторы не раздувают
+вычисление, а пользователи делятся на блоки по оценке числа пар,
+так что память на блок ограничена BLOCK_PAIRS.
+
+Таблица пересобирается периодически командой rebuild_suggestions.
+"""
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.caching import bump_versions, get_versions
+
+from .following import get_following
+from .models import Follow, Suggestion
+
+FRIENDS_OF_FRIENDS_WEIGHT = 1.0
+CO_FOLLOW_WEIGHT = 0.5
+
+BLOCK_PAIRS = 2_000_000
+BATCH_SIZE = 1000
+
+SUGGESTIONS_KEY = 'posts:suggestions:{}:{}'
+
+
+class CSR:
+    """Списки смежности в формате CSR: соседи вершины ``i`` —
+    ``indices[indptr[i]:indptr[i + 1]]``, отсортированные по возрастанию."""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, rows, cols, size):
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+        return cls(indptr, cols[order])
+
+    def gather(self, rows, limit=None):
+        """Соседи вершин ``rows`` одним массивом и номера позиций в
+        ``rows``, которым они принадлежат; у каждой вершины берётся
+        не больше ``limit`` соседей."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        if limit is not None:
+            lengths = np.minimum(lengths, limit)
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        offsets = (
+            np.arange(int(lengths.sum()))
+            - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            + np.repeat(starts, lengths)
+        )
+        return owners, self.indices[offsets]
+
+
+class FollowGraph:
+    """Граф подписок с плотной нумерацией вершин: ``ids[i]`` — id
+    пользователя вершины ``i``."""
+
+    def __init__(self, users, authors):
+        self.ids, inverse = np.unique(
+            np.concatenate([users, authors]), return_inverse=True
+        )
+        users, authors = np.split(inverse.reshape(-1), [len(users)])
+        size = len(self.ids)
+        self.following = CSR.from_edges(users, authors, size)
+        self.followers = CSR.from_edges(authors, users, size)
+
+    @classmethod
+    def load(cls):
+        edges = array('q')
+        for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id'
+        ).iterator(chunk_size=BATCH_SIZE):
+            edges.append(user_id)
+            edges.append(author_id)
+        edges = np.frombuffer(edges, dtype=np.int64).reshape(-1, 2)
+        return cls(edges[:, 0], edges[:, 1])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def score_block(self, users, limit):
+        """Кандидаты для вершин ``users``: массивы вершин пользователей,
+        вершин кандидатов и их оценок."""
+        size = len(self)
+        owners, followed = self.following.gather(users, limit)
+        followed_owners = users[owners]
+        hops, candidates = self.following.gather(followed, limit)
+        keys = [followed_owners[hops] * size + candidates]
+        weights = [np.full(len(candidates), FRIENDS_OF_FRIENDS_WEIGHT)]
+        hops, readers = self.followers.gather(followed, limit)
+        reader_owners = followed_owners[hops]
+        others = readers != reader_owners
+        hops, candidates = self.following.gather(readers[others], limit)
+        keys.append(reader_owners[others][hops] * size + candidates)
+        weights.append(np.full(len(candidates), CO_FOLLOW_WEIGHT))
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        scores = np.bincount(
+            inverse.reshape(-1), weights=np.concatenate(weights)
+        )
+        owners, candidates = np.divmod(keys, size)
+        # Уже читаемые авторы — по полным спискам подписок, а не по
+        # урезанным до ``limit``.
+        owners_all, followed_all = self.following.gather(users)
+        known = np.isin(keys, users[owners_all] * size + followed_all)
+        keep = ~known & (owners != candidates)
+        return owners[keep], candidates[keep], scores[keep]
+
+    def block_costs(self, limit):
+        """Оценка числа пар (пользователь, кандидат) для каждой вершины."""
+        size = len(self)
+        out_degrees = np.diff(self.following.indptr)
+        if limit is not None:
+            out_degrees = np.minimum(out_degrees, limit)
+        owners, readers = self.followers.gather(np.arange(size), limit)
+        hop_costs = out_degrees + np.bincount(
+            owners, weights=out_degrees[readers], minlength=size
+        )
+        owners, followed = self.following.gather(np.arange(size), limit)
+        return 1 + np.bincount(
+            owners, weights=hop_costs[followed], minlength=size
+        )
+
+    def blocks(self, limit):
+        """Вершины пользователей с подписками, разбитые на блоки
+        примерно по BLOCK_PAIRS пар."""
+        readers = np.flatnonzero(np.diff(self.following.indptr))
+        costs = np.cumsum(self.block_costs(limit)[readers])
+        _, starts = np.unique(costs // BLOCK_PAIRS, return_index=True)
+        return np.split(readers, starts[1:])
+
+    def suggest(self, top, limit=None):
+        """(id пользователя, id автора, оценка) — до ``top`` лучших
+        кандидатов каждого пользователя, от лучших к худшим."""
+        for users in self.blocks(limit):
+            owners, candidates, scores = self.score_block(users, limit)
+            order = np.lexsort((candidates, -scores, owners))
+            owners, candidates, scores = (
+                owners[order], candidates[order], scores[order]
+            )
+            group_starts = np.flatnonzero(
+                np.r_[True, owners[1:] != owners[:-1]]
+            )
+            counts = np.diff(np.r_[group_starts, len(owners)])
+            ranks = np.arange(len(owners)) - np.repeat(group_starts, counts)
+            best = ranks < top
+            yield from zip(
+                self.ids[owners[best]].tolist(),
+                self.ids[candidates[best]].tolist(),
+                scores[best].tolist(),
+            )
+
+
+def rebuild():
+    """Пересчитывает таблицу рекомендаций, возвращает число строк."""
+    graph = FollowGraph.load()
+    rows = graph.suggest(
+        settings.SUGGESTIONS_STORED, settings.SUGGESTIONS_FANOUT_LIMIT
+    )
+    total = 0
+    with transaction.atomic():
+        Suggestion.objects.all().delete()
+        batch = []
+        for user_id, author_id, score in rows:
+            batch.append(Suggestion(
+                user_id=user_id, author_id=author_id, score=score
+            ))
+            if len(batch) >= BATCH_SIZE:
+                Suggestion.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        Suggestion.objects.bulk_create(batch)
+        total += len(batch)
+    bump_versions('suggestions')
+    return total
+
+
+def get_suggested_authors(user):
+    """Рекомендованные пользователю авторы из таблицы Suggestion
+    без тех, на кого он уже подписан."""
+    if not user.is_authenticated:
+        return []
+    key = SUGGESTIONS_KEY.format(user.pk, *get_versions('suggestions'))
+    authors = cache.get(key)
+    if authors is None:
+        authors = [
+            suggestion.author for suggestion in Suggestion.objects.filter(
+                user_id=user.pk
+            ).select_related('author').order_by('-score', 'author_id')
+        ]
+        cache.set(key, authors, settings.OBJECT_CACHE_TIMEOUT)
+    if not authors:
+        return []
+    following = get_following(user)
+    return [
+        author for author in authors if author.pk not in following
+    ][:settings.SUGGESTIONS_LIMIT]
@@ -0,0 +1,18 @@
+from django import template
+
+from posts.following import get_following
+from posts.suggestions import get_suggested_authors
+
+register = template.Library()
+
+
+@register.filter
+def follows(user, author):
+    """Подписан ли пользователь на автора (объект или id)."""
+    return getattr(author, 'pk', author) in get_following(user)
+
+
+@register.simple_tag
+def suggested_authors(user):
+    """Авторы, которых пользователю стоит почитать."""
+    return get_suggested_authors(user)
@@ -0,0 +1,120 @@
+import base64
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from ..utils import POSTS_PER_PAGE
+
+
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост #{i}", author=cls.author, group=cls.group
+            )
+            for i in range(POSTS_PER_PAGE + 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse("posts:api_index"),
+            reverse("posts:api_group_posts", args=[self.group.slug]),
+            reverse("posts:api_profile", args=[self.author.username]),
+        ]
+
+    def test_feeds(self):
+        """Ленты отдают посты от новых к старым и ссылку на продолжение."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(
+                    [post["id"] for post in data["results"]],
+                    [post.pk for post in self.posts[::-1][:POSTS_PER_PAGE]],
+                )
+                self.assertEqual(data["results"][0]["author"], "author")
+                self.assertEqual(data["results"][0]["group"], "group")
+                self.assertIsNone(data["previous"])
+                data = self.client.get(data["next"]).json()
+                self.assertEqual(
+                    [post["id"] for post in data["results"]],
+                    [post.pk for post in self.posts[1::-1]],
+                )
+                self.assertIsNone(data["next"])
+
+    def test_empty_cursor_page(self):
+        """Пустая страница по курсору не отдаёт ссылок ?cursor=None."""
+        cursor = base64.urlsafe_b64encode(
+            b"n|2000-01-01T00:00:00+00:00|1"
+        ).decode()
+        data = self.client.get(
+            reverse("posts:api_index"), {"cursor": cursor}
+        ).json()
+        self.assertEqual(data["results"], [])
+        self.assertIsNone(data["next"])
+        self.assertIsNone(data["previous"])
+
+    def test_post_detail(self):
+        """Пост отдаётся по id, несуществующий — 404."""
+        post = self.posts[0]
+        data = self.client.get(
+            reverse("posts:api_post_detail", args=[post.pk])
+        ).json()
+        self.assertEqual(data["text"], post.text)
+        self.assertIsNone(data["image"])
+        response = self.client.get(
+            reverse("posts:api_post_detail", args=[post.pk + 1000])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_sparse_fields(self):
+        """?fields= ограничивает набор полей, неизвестные поля — 400."""
+        url = reverse("posts:api_index")
+        data = self.client.get(url, {"fields": "id,text"}).json()
+        self.assertEqual(set(data["results"][0]), {"id", "text"})
+        response = self.client.get(url, {"fields": "id,password"})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_not_modified(self):
+        """С актуальным ETag ответ 304 без запросов к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response["ETag"].startswith('"'))
+                self.assertIn("Last-Modified", response)
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes(self):
+        """ETag меняется после нового поста и комментария."""
+        url = reverse("posts:api_post_detail", args=[self.posts[0].pk])
+        etags = [self.client.get(url)["ETag"]]
+        Comment.objects.create(
+            post=self.posts[0], author=self.author, text="Комментарий"
+        )
+        etags.append(self.client.get(url)["ETag"])
+        index_etag = self.client.get(self.urls[0])["ETag"]
+        Post.objects.create(text="Новый пост", author=self.author)
+        self.assertNotEqual(etags[0], etags[1])
+        self.assertNotEqual(index_etag, self.client.get(self.urls[0])["ETag"])
+
+    def test_etag_depends_on_url(self):
+        """ETag одной страницы не подходит к другой странице или другому
+        набору полей той же ленты."""
+        response = self.client.get(self.urls[0])
+        etag = response["ETag"]
+        for url in (f"{self.urls[0]}?fields=id", response.json()["next"]):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response["ETag"], etag)
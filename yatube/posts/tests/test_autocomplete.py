@@ -0,0 +1,57 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import autocomplete
+from ..models import User
+
+
+class AuthorAutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(
+            username="leo", first_name="Лев", last_name="Толстой"
+        )
+        User.objects.create_user(
+            username="fedor", first_name="Фёдор", last_name="Достоевский"
+        )
+        User.objects.create_user(username="tolstoy_fan")
+
+    def setUp(self):
+        autocomplete._index = None
+        self.client = Client()
+
+    def complete(self, query):
+        response = self.client.get(
+            reverse("posts:author_autocomplete"), {"q": query}
+        )
+        return [user["username"] for user in response.json()["results"]]
+
+    def test_autocomplete_prefixes(self):
+        """Авторы находятся по началу имени пользователя, полного имени
+        или фамилии."""
+        cases = {
+            "le": ["leo"],
+            "лев т": ["leo"],
+            "толс": ["leo"],
+            "TOL": ["tolstoy_fan"],
+            "до": ["fedor"],
+            "x": [],
+            "": [],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.complete(query), expected)
+
+    def test_autocomplete_without_queries(self):
+        """После построения индекса запросы к БД не выполняются,
+        а новые и удалённые пользователи учитываются сразу."""
+        self.complete("l")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete("le"), ["leo"])
+        user = User.objects.create_user(username="lermontov")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete("le"), ["leo", "lermontov"])
+        user.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete("le"), ["leo"])
@@ -0,0 +1,138 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, Group, Post,
+                      StoredFile, Suggestion, User)
+
+
+class RebuildFollowFeedCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.follower = User.objects.create_user(username="follower")
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.posts = [
+            Post.objects.create(text=f"Пост #{i}", author=cls.author)
+            for i in range(3)
+        ]
+
+    def test_rebuild_restores_feed(self):
+        """Команда rebuild_follow_feed восстанавливает ленты подписок."""
+        FeedEntry.objects.all().delete()
+        call_command("rebuild_follow_feed", stdout=StringIO())
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.follower).values_list("post_id", flat=True)),
+            {post.pk for post in self.posts},
+        )
+
+
+class ReconcileCountersCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            text="Пост", author=cls.author, group=cls.group
+        )
+
+    def test_reconcile_repairs_drift(self):
+        """Команда reconcile_counters исправляет рассинхронизацию."""
+        Group.objects.update(posts_count=42)
+        AuthorStats.objects.filter(user=self.author).delete()
+        Post.objects.update(image="posts/ab/cd/abcd.png")
+        call_command("reconcile_counters", stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(
+            StoredFile.objects.get(name="posts/ab/cd/abcd.png").references, 1
+        )
+
+
+class RebuildSuggestionsCommandTest(TestCase):
+    def test_rebuild_suggestions(self):
+        """Команда rebuild_suggestions пересчитывает рекомендации."""
+        reader, author, friend = (
+            User.objects.create_user(username=name)
+            for name in ("reader", "author", "friend")
+        )
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=friend)
+        out = StringIO()
+        call_command("rebuild_suggestions", stdout=out)
+        self.assertIn("Рекомендаций: 1", out.getvalue())
+        self.assertTrue(
+            Suggestion.objects.filter(user=reader, author=friend).exists()
+        )
+
+
+class ExportDataCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.old_post = Post.objects.create(
+            text="Старый пост", author=cls.author
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=cls.old_post.pub_date - timedelta(days=30)
+        )
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Да")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command(
+            "export_data", *args, output_dir=self.output_dir, stdout=out
+        )
+        return out.getvalue()
+
+    def test_ndjson_gzip(self):
+        """Выгрузка в NDJSON со сжатием, по файлу на модель."""
+        report = self.export("--gzip")
+        self.assertIn("posts: 2 строк", report)
+        path = os.path.join(self.output_dir, "comments.ndjson.gz")
+        with gzip.open(path, "rt", encoding="utf-8") as ndjson:
+            rows = [json.loads(line) for line in ndjson]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["text"], "Да")
+        self.assertEqual(rows[0]["post_id"], self.post.pk)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.output_dir, "follows.ndjson.gz"))
+        )
+
+    def test_csv_since(self):
+        """--since выгружает только записи не старше заданной даты."""
+        since = (self.post.pub_date - timedelta(days=1)).date().isoformat()
+        self.export("posts", "--format", "csv", "--since", since)
+        path = os.path.join(self.output_dir, "posts.csv")
+        with open(path, encoding="utf-8", newline="") as csv_file:
+            rows = list(csv.DictReader(csv_file))
+        self.assertEqual([row["text"] for row in rows], ["Пост"])
+
+    def test_invalid_arguments(self):
+        """Неизвестная выгрузка или дата — ошибка команды."""
+        for args in (["likes"], ["--since", "вчера"]):
+            with self.subTest(args=args):
+                with self.assertRaises(CommandError):
+                    self.export(*args)
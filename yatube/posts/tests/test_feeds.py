@@ -0,0 +1,83 @@
+from http import HTTPStatus
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.posts = [
+            Post.objects.create(
+                text=f"Пост #{i}", author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse("posts:index_feed"),
+            reverse("posts:group_feed", args=[self.group.slug]),
+            reverse("posts:profile_feed", args=[self.author.username]),
+        ]
+
+    def get_xml(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return ElementTree.fromstring(b"".join(response.streaming_content))
+
+    @override_settings(FEED_ITEMS=2)
+    def test_rss(self):
+        """RSS содержит FEED_ITEMS последних постов от новых к старым."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                items = self.get_xml(url).findall("channel/item")
+                self.assertEqual(
+                    [item.findtext("title") for item in items],
+                    ["Пост #2", "Пост #1"],
+                )
+                self.assertEqual(items[0].findtext("category"), "Группа")
+
+    def test_atom(self):
+        """С ?format=atom лента отдаётся в Atom."""
+        root = self.get_xml(self.urls[0], format="atom")
+        entries = root.findall(f"{ATOM}entry")
+        self.assertEqual(len(entries), len(self.posts))
+        self.assertEqual(
+            entries[0].findtext(f"{ATOM}author/{ATOM}name"), "Лев Толстой"
+        )
+
+    def test_cached(self):
+        """Повторный опрос обслуживается из кеша, с ETag — ответом 304,
+        новый пост сбрасывает кеш."""
+        url = self.urls[0]
+        content = b"".join(self.client.get(url).streaming_content)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.content, content)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(
+            self.get_xml(url).findtext("channel/item/title"), "Новый пост"
+        )
+
+    def test_missing_group(self):
+        """Лента несуществующего сообщества — 404."""
+        response = self.client.get(reverse("posts:group_feed", args=["no"]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
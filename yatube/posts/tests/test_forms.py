@@ -1,13 +1,19 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Comment, Group, Post, User
+from core import images
+
+from .. import counters
+from ..models import Comment, Group, Post, StoredFile, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -70,7 +76,101 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(latest_post.text, form_data["text"])
         self.assertEqual(latest_post.group.pk, form_data["group"])
         self.assertEqual(latest_post.author, self.user_author)
-        self.assertEqual(latest_post.image, "posts/small.gif")
+        with latest_post.image.open() as image:
+            digest = hashlib.sha256(image.read()).hexdigest()
+        self.assertEqual(
+            latest_post.image,
+            f"posts/{digest[:2]}/{digest[2:4]}/{digest}.gif",
+        )
+
+    @staticmethod
+    def make_image(name, size, image_format, **options):
+        buffer = BytesIO()
+        Image.new("RGB", size, (255, 0, 0)).save(
+            buffer, image_format, **options
+        )
+        return SimpleUploadedFile(name=name, content=buffer.getvalue())
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_create_form_downscales_image_and_strips_exif(self):
+        """Загруженная картинка уменьшается и теряет метаданные EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = "Камера"
+        uploaded = self.make_image(
+            "photo.jpg", (400, 200), "JPEG", exif=exif.tobytes()
+        )
+        self.post_author.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с фото", "image": uploaded},
+        )
+        post = Post.objects.latest("id")
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn("exif", image.info)
+
+    def test_draft_keeps_aspect_ratio(self):
+        """JPEG больше IMAGE_MAX_SIDE декодируется в уменьшенном
+        масштабе и для неквадратных картинок."""
+        uploaded = self.make_image("wide.jpg", (1200, 800), "JPEG")
+        with Image.open(uploaded) as image:
+            images.draft(image, 500)
+            self.assertEqual(image.size, (600, 400))
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_create_form_applies_exif_orientation(self):
+        """Уменьшенная картинка поворачивается по EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        uploaded = self.make_image(
+            "rotated.jpg", (400, 200), "JPEG", exif=exif.tobytes()
+        )
+        self.post_author.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с повёрнутым фото", "image": uploaded},
+        )
+        post = Post.objects.latest("id")
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_create_form_rejects_too_many_pixels(self):
+        """Картинка с превышением лимита пикселей не принимается."""
+        posts_count = Post.objects.count()
+        uploaded = self.make_image("big.png", (20, 20), "PNG")
+        response = self.post_author.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с большой картинкой", "image": uploaded},
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Изображение слишком большое: не больше 100 пикселей.",
+        )
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом, который удаляется
+        только вместе с последним ссылающимся на него постом."""
+        for i in range(2):
+            self.post_author.post(
+                reverse("posts:post_create"),
+                data={
+                    "text": f"Пост #{i}",
+                    "image": self.make_image(f"meme_{i}.png", (10, 10), "PNG"),
+                },
+            )
+        first, second = Post.objects.order_by("id")[:2]
+        self.assertEqual(first.image.name, second.image.name)
+        stored = StoredFile.objects.get(name=first.image.name)
+        self.assertEqual(stored.references, 2)
+        first.delete()
+        counters.collect_file(first.image)
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        second.delete()
+        counters.collect_file(second.image)
+        self.assertFalse(second.image.storage.exists(second.image.name))
+        self.assertFalse(StoredFile.objects.exists())
 
     def test_valid_edit_form_edit_post(self):
         '''При отправке валидной формы со страницы редактирования поста
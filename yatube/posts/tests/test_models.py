@@ -1,6 +1,6 @@
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -49,3 +49,66 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected)
+
+
+class CountersModelTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.another_group = Group.objects.create(title="Другая", slug="other")
+
+    def test_counters_follow_writes(self):
+        """Счётчики постов, комментариев и подписок меняются
+        при создании и удалении объектов."""
+        post = Post.objects.create(
+            author=self.author, text="Пост", group=self.group
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0
+        )
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 0
+        )
+
+    def test_counters_survive_edit(self):
+        """Редактирование поста переносит счётчик между группами
+        и не затирает счётчик комментариев."""
+        post = Post.objects.create(
+            author=self.author, text="Пост", group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        post.group = self.another_group
+        post.save()
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.another_group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.another_group.posts_count, 1)
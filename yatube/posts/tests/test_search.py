@@ -0,0 +1,116 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, User
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.relevant = Post.objects.create(
+            text="Котики, котики и ещё раз котики", author=cls.user
+        )
+        cls.other = Post.objects.create(
+            text="Про котиков <b>и</b> собак", author=cls.user
+        )
+        cls.unrelated = Post.objects.create(
+            text="Погода на выходные", author=cls.user
+        )
+
+    def setUp(self):
+        search._index = None
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(
+            reverse("posts:post_search"), {"q": query}
+        )
+        return list(response.context["page_obj"])
+
+    def check_search(self):
+        self.assertEqual(self.found("котик"), [self.relevant, self.other])
+        self.assertEqual(self.found("котик собак"), [self.other])
+        self.assertEqual(self.found("космос"), [])
+        self.assertEqual(self.found(""), [])
+
+    def test_search_fts(self):
+        """Поиск через FTS5 находит посты по префиксам слов
+        и ранжирует их по релевантности."""
+        self.assertTrue(search.uses_fts())
+        self.check_search()
+
+    @override_settings(SEARCH_ENGINE="python")
+    def test_search_python_index(self):
+        """Индекс в памяти ищет так же, как FTS5."""
+        self.check_search()
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        for engine in ("fts5", "python"):
+            with self.subTest(engine=engine), self.settings(
+                SEARCH_ENGINE=engine
+            ):
+                post = Post.objects.create(
+                    text="Погода на завтра", author=self.user
+                )
+                self.assertIn(post, self.found("погода"))
+                post.text = "Погода для котиков"
+                post.save()
+                self.assertIn(post, self.found("котик"))
+                Post.objects.get(pk=post.pk).delete()
+                self.assertNotIn(post, self.found("котик"))
+
+    def test_search_highlights_matches(self):
+        """Найденные слова выделяются, а HTML из текста экранируется."""
+        response = self.client.get(
+            reverse("posts:post_search"), {"q": "собак"}
+        )
+        self.assertContains(
+            response,
+            "Про котиков &lt;b&gt;и&lt;/b&gt; <mark>собак</mark>",
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через поисковый индекс."""
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "котик"}
+        )
+        self.assertEqual(
+            set(response.context["cl"].result_list),
+            {self.relevant, self.other},
+        )
+        self.assertNotContains(response, "Показаны только первые")
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_admin_search_reports_truncation(self):
+        """Админка предупреждает, что результаты поиска обрезаны."""
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "котик"}
+        )
+        self.assertEqual(len(response.context["cl"].result_list), 1)
+        self.assertContains(response, "Показаны только первые 1")
+
+    def test_python_index_keeps_tokens_sorted(self):
+        """Список слов индекса в памяти отсортирован и совпадает со
+        словами, у которых есть посты, после добавлений и удалений."""
+        index = search.InvertedIndex.build([(1, "бета альфа")])
+        index.add(2, "гамма альфа")
+        index.add(1, "дельта")
+        index.remove(2)
+        self.assertEqual(index.tokens, ["дельта"])
+        self.assertEqual(index.tokens, sorted(index.postings))
+        index.add(3, "альфа бета альфа")
+        self.assertEqual(index.tokens, ["альфа", "бета", "дельта"])
+        self.assertEqual(index.search(["а"], 10), [3])
+        self.assertEqual(index.search(["д"], 10), [1])
@@ -0,0 +1,88 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Suggestion, User
+from ..suggestions import FollowGraph, get_suggested_authors, rebuild
+
+
+class FollowGraphTest(TestCase):
+    def test_scores(self):
+        """Друзья друзей и совместные подписки дают кандидатам оценки,
+        уже читаемые авторы и сам пользователь не предлагаются."""
+        # 1 -> 2, 1 -> 3; 2 -> 4; 5 -> 2, 5 -> 6; 3 -> 1
+        graph = FollowGraph(
+            np.array([1, 1, 2, 5, 5, 3]), np.array([2, 3, 4, 2, 6, 1])
+        )
+        suggestions = {
+            (user, author): score
+            for user, author, score in graph.suggest(top=10)
+        }
+        self.assertEqual(suggestions[(1, 4)], 1.0)
+        self.assertEqual(suggestions[(1, 6)], 0.5)
+        self.assertNotIn((1, 1), suggestions)
+        self.assertNotIn((1, 2), suggestions)
+        self.assertNotIn((1, 3), suggestions)
+
+    def test_top_limits_each_user(self):
+        """У каждого пользователя остаётся не больше top лучших."""
+        graph = FollowGraph(
+            np.array([1, 1, 2, 2, 2, 6]), np.array([2, 6, 3, 4, 5, 4])
+        )
+        rows = list(graph.suggest(top=1))
+        self.assertEqual(
+            [(user, author) for user, author, _ in rows if user == 1],
+            [(1, 4)],
+        )
+
+    def test_fanout_limit_keeps_followed_hidden(self):
+        """Ограничение числа соседей не возвращает в рекомендации
+        авторов, на которых пользователь уже подписан."""
+        # 1 -> 2, 1 -> 3; 2 -> 3
+        graph = FollowGraph(np.array([1, 1, 2]), np.array([2, 3, 3]))
+        self.assertNotIn(
+            (1, 3),
+            [(user, author) for user, author, _ in graph.suggest(10, 1)],
+        )
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        cls.friend = User.objects.create_user(username="friend")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.friend)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_rebuild_stores_suggestions(self):
+        """rebuild заполняет таблицу рекомендаций по графу подписок."""
+        self.assertEqual(rebuild(), 1)
+        self.assertEqual(
+            list(Suggestion.objects.values_list("user", "author")),
+            [(self.reader.pk, self.friend.pk)],
+        )
+
+    @override_settings(SUGGESTIONS_LIMIT=1)
+    def test_followed_authors_are_hidden(self):
+        """Авторы, на которых пользователь уже подписан, не показываются."""
+        rebuild()
+        self.assertEqual(get_suggested_authors(self.reader), [self.friend])
+        Follow.objects.create(user=self.reader, author=self.friend)
+        self.reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(get_suggested_authors(self.reader), [])
+
+    def test_suggestions_on_pages(self):
+        """Рекомендации выводятся в ленте подписок и в профиле."""
+        rebuild()
+        profile_url = reverse("posts:profile", args=[self.friend.username])
+        for url in (reverse("posts:follow_index"),
+                    reverse("posts:profile", args=[self.author.username])):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), profile_url)
@@ -0,0 +1,44 @@
+from django.core.paginator import Paginator
+from django.test import SimpleTestCase, override_settings
+
+from ..utils import feed_count, get_page_window
+
+
+class PageWindowTest(SimpleTestCase):
+    def test_page_window(self):
+        """Навигация показывает окно вокруг текущей страницы."""
+        paginator = Paginator(range(2000), 10)
+        cases = {
+            1: [1, 2, 3, None, 200],
+            5: [1, 2, 3, 4, 5, 6, 7, None, 200],
+            100: [1, None, 98, 99, 100, 101, 102, None, 200],
+            199: [1, None, 197, 198, 199, 200],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    get_page_window(paginator.page(number)), expected
+                )
+
+    def test_short_page_window(self):
+        """Если страниц мало, показываются все."""
+        paginator = Paginator(range(30), 10)
+        self.assertEqual(get_page_window(paginator.page(2)), [1, 2, 3])
+
+
+class FeedCountTest(SimpleTestCase):
+    def count(self):
+        raise AssertionError('COUNT(*) не должен выполняться')
+
+    @override_settings(
+        PAGINATOR_COUNT='cached', PAGINATOR_ESTIMATE_THRESHOLD=1000
+    )
+    def test_large_feed_uses_estimate(self):
+        """Для большой ленты число берётся из оценки без подсчёта."""
+        count = feed_count(self.count, name='test', estimate=lambda: 5000)
+        self.assertEqual(count(), 5000)
+
+    @override_settings(PAGINATOR_COUNT='none')
+    def test_count_disabled(self):
+        """В режиме 'none' число объектов не считается."""
+        self.assertIsNone(feed_count(self.count, name='test')())
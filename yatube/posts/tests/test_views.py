@@ -1,14 +1,23 @@
+import base64
 import shutil
 import tempfile
+from http import HTTPStatus
+from unittest import mock, skipUnless
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post, User
+from core import thumbnails
+
+from .. import lookups
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+from ..utils import COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -24,7 +33,7 @@ class PostPagesTests(TestCase):
             description="Тестовое описание",
         )
         cls.user_author = User.objects.create_user(username="user_author")
-        small_gif = (
+        cls.small_gif = small_gif = (
             b"\x47\x49\x46\x38\x39\x61\x02\x00"
             b"\x01\x00\x80\x00\x00\x00\x00\x00"
             b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
@@ -207,6 +216,54 @@ class PostPagesTests(TestCase):
         )
         self.assertIn(comment, response.context["comments"])
 
+    def test_post_image_thumbnail_fallback(self):
+        """До генерации миниатюры в ленте показывается оригинал,
+        после генерации — миниатюра."""
+        url = reverse("posts:index")
+        response = self.post_author.get(url)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        thumbnails.generate(self.post.image)
+        picture = thumbnails.get_picture(self.post.image, "card")
+        self.assertNotEqual(picture["src"], self.post.image.url)
+        cache.clear()
+        response = self.post_author.get(url)
+        self.assertContains(response, f'src="{picture["src"]}"')
+        self.assertContains(response, 'width="960" height="480"')
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertContains(response, f" {width}w")
+
+    @override_settings(THUMBNAIL_FORMATS=("AVIF",))
+    def test_unsupported_thumbnail_formats_skipped(self):
+        """Форматы, которые не умеет сохранять sorl-thumbnail,
+        не попадают в версии миниатюр."""
+        self.assertEqual(thumbnails.get_formats(), [])
+        self.assertEqual(
+            [rendition[:2] for rendition in thumbnails.get_renditions("card")],
+            [(320, None), (640, None), (960, None)],
+        )
+
+    def test_post_thumbnails_prefetched(self):
+        """Миниатюры страницы читаются из key-value хранилища одним
+        запросом к БД независимо от числа постов."""
+        for i in range(3):
+            Post.objects.create(
+                text=f"Пост с картинкой #{i}",
+                author=self.user_author,
+                image=SimpleUploadedFile(
+                    name=f"small_{i}.gif", content=self.small_gif,
+                    content_type="image/gif",
+                ),
+            )
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.post_author.get(reverse("posts:index"))
+        kvstore_queries = [
+            query for query in queries
+            if "thumbnail_kvstore" in query["sql"]
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
     def test_index_page_cache(self):
         """Тест для проверки кеширования главной страницы."""
         post = Post.objects.create(
@@ -215,16 +272,85 @@ class PostPagesTests(TestCase):
         post_on_index = self.post_author.get(
             reverse("posts:index")
         ).content
-        post.delete()
-        post_on_index_delete = self.post_author.get(
+        Post.objects.filter(pk=post.pk).update(text="Изменён без сигналов")
+        post_on_index_update = self.post_author.get(
             reverse("posts:index")
         ).content
-        self.assertEqual(post_on_index, post_on_index_delete)
+        self.assertEqual(post_on_index, post_on_index_update)
         cache.clear()
-        post_on_index_delete_cache = self.post_author.get(
+        post_on_index_update_cache = self.post_author.get(
             reverse("posts:index")
         ).content
-        self.assertNotEqual(post_on_index_delete, post_on_index_delete_cache)
+        self.assertNotEqual(post_on_index_update, post_on_index_update_cache)
+
+    def test_cached_pages_invalidated_on_write(self):
+        """Закешированные страницы обновляются сразу после записи."""
+        pages = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse(
+                "posts:profile", kwargs={"username": self.user_author.username}
+            ),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        ]
+        for url in pages:
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("posts:index"))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Отредактированный текст"
+        post.save()
+        Comment.objects.create(
+            post=post, author=self.user_author, text="Новый комментарий"
+        )
+        feed_pages, detail_page = pages[:-1], pages[-1]
+        for url in feed_pages:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn("Отредактированный текст", content)
+                self.assertIn("Комментариев: 1", content)
+        content = self.client.get(detail_page).content.decode()
+        self.assertIn("Отредактированный текст", content)
+        self.assertIn("Новый комментарий", content)
+
+    def test_cached_pages_invalidated_on_author_rename(self):
+        """Карточки постов в кешированных лентах обновляются после
+        смены имени или username автора."""
+        pages = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+        ]
+        for url in pages:
+            self.client.get(url)
+        author = User.objects.get(pk=self.user_author.pk)
+        author.first_name, author.last_name = "Лев", "Толстой"
+        author.save()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "Лев Толстой")
+        author.username = "leo"
+        author.save()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.client.get(url),
+                    reverse("posts:profile", args=["leo"]),
+                )
+
+    def test_index_cache_does_not_leak_user_header(self):
+        """Закешированная главная страница дорисовывает шапку
+        для каждого пользователя отдельно."""
+        guest_content = self.client.get(reverse("posts:index")).content
+        Post.objects.filter(pk=self.post.pk).update(
+            text="Пост после кеширования"
+        )
+        author_content = self.post_author.get(reverse("posts:index")).content
+        self.assertNotIn("Пост после кеширования".encode(), author_content)
+        self.assertIn("Войти".encode(), guest_content)
+        self.assertNotIn("Войти".encode(), author_content)
+        self.assertIn(self.user_author.username.encode(), author_content)
+        self.assertIn("Мои подписки".encode(), author_content)
+        self.assertNotIn("Мои подписки".encode(), guest_content)
 
 
 class PaginatorViewsTest(TestCase):
@@ -270,6 +396,215 @@ class PaginatorViewsTest(TestCase):
                     posts_on_second_page
                 )
 
+    def test_paginator_cursor_navigation(self):
+        """Переход по курсорам возвращает те же страницы,
+        что и номерная пагинация."""
+        url = reverse('posts:index')
+        first_page = self.unauthorized_client.get(url).context['page_obj']
+        second_page = self.unauthorized_client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            list(second_page),
+            list(self.unauthorized_client.get(
+                url, {'page': 2}).context['page_obj'])
+        )
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        back_page = self.unauthorized_client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_paginator_cursor_keeps_page_number(self):
+        """Страница по курсору знает свой номер и рисует навигацию,
+        а ссылки на соседние номерные страницы ведут на ?page=."""
+        url = reverse('posts:index')
+        response = self.unauthorized_client.get(url)
+        self.assertContains(response, '?page=2')
+        self.assertNotContains(response, 'cursor=')
+        first_page = response.context['page_obj']
+        response = self.unauthorized_client.get(
+            url, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(second_page.number, 2)
+        self.assertEqual(response.context['page_window'], [1, 2])
+        self.assertContains(response, '?page=1')
+        back_page = self.unauthorized_client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(back_page.number, 1)
+
+    def test_paginator_empty_cursor_page(self):
+        """Курсор за краем ленты или устаревший курсор открывает первую
+        страницу, пустая страница по курсору не ссылается на соседние."""
+        newest = Post.objects.order_by('-pub_date', '-pk').first()
+        cursors = [
+            ('n', '2000-01-01T00:00:00+00:00', 1),
+            ('p', newest.pub_date.isoformat(), newest.pk),
+        ]
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        for direction, value, pk in cursors:
+            cursor = base64.urlsafe_b64encode(
+                f'{direction}|{value}|{pk}'.encode()
+            ).decode()
+            with self.subTest(direction=direction):
+                page = paginator.cursor_page(cursor)
+                self.assertFalse(page.has_next())
+                self.assertFalse(page.has_previous())
+                response = self.unauthorized_client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_paginator_invalid_cursor(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.unauthorized_client.get(
+            reverse('posts:index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def count_queries(self, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            page_obj = self.unauthorized_client.get(
+                url, data
+            ).context['page_obj']
+        counts = [q for q in queries if 'COUNT(' in q['sql'].upper()]
+        return page_obj, len(counts)
+
+    @override_settings(PAGINATOR_COUNT='cached')
+    def test_paginator_count_cached_until_write(self):
+        """Число постов ленты кешируется и пересчитывается после записи."""
+        url = reverse('posts:index')
+        page_obj, counts = self.count_queries(url, {'page': 1})
+        self.assertEqual((page_obj.paginator.count, counts), (13, 1))
+        page_obj, counts = self.count_queries(url, {'page': 2})
+        self.assertEqual((page_obj.paginator.count, counts), (13, 0))
+        Post.objects.create(text='Новый пост', author=self.user)
+        page_obj, counts = self.count_queries(url, {'page': 2})
+        self.assertEqual((page_obj.paginator.count, counts), (14, 1))
+
+    @override_settings(
+        PAGINATOR_COUNT='cached', PAGINATOR_ESTIMATE_THRESHOLD=5
+    )
+    def test_paginator_stale_estimate(self):
+        """Устаревшая оценка числа постов не скрывает старые посты:
+        соседние страницы определяются по выбранным строкам."""
+        url = reverse('posts:index')
+        with mock.patch('posts.views.estimate_rows', return_value=5):
+            page_obj, counts = self.count_queries(url, {'page': 1})
+            self.assertEqual(counts, 0)
+            self.assertEqual(page_obj.paginator.count, 5)
+            self.assertTrue(page_obj.has_next())
+            response = self.unauthorized_client.get(url, {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+        self.assertEqual(response.context['page_window'], [1, 2])
+        self.assertNotContains(response, 'Последняя')
+
+    @override_settings(PAGINATOR_COUNT='none')
+    def test_paginator_without_count(self):
+        """Без подсчёта страницы знают только о соседних страницах."""
+        url = reverse('posts:index')
+        page_obj, counts = self.count_queries(url, {'page': 1})
+        self.assertEqual(counts, 0)
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.has_next())
+        self.assertFalse(page_obj.has_previous())
+        response = self.unauthorized_client.get(url, {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+        self.assertEqual(response.context['page_window'], [])
+        self.assertContains(response, '?page=1')
+        self.assertNotContains(response, 'Последняя')
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Комментарий #{i}"
+            )
+            for i in range(COMMENTS_PER_PAGE + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("posts:post_comments", args=[self.post.pk])
+
+    def test_first_page_inline(self):
+        """На странице поста только первая страница комментариев
+        и ссылка на подгрузку следующих."""
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        self.assertEqual(
+            list(response.context["comments"]),
+            self.comments[:COMMENTS_PER_PAGE],
+        )
+        self.assertContains(response, f"{self.url}?cursor=")
+
+    def test_next_page_fragment(self):
+        """Следующие комментарии отдаются HTML-фрагментом по курсору."""
+        cursor = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        ).context["comments_page"].next_cursor
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(
+            list(response.context["comments"]),
+            self.comments[COMMENTS_PER_PAGE:],
+        )
+        self.assertNotContains(response, "<html")
+        self.assertNotContains(response, "data-comments-more")
+
+    def test_json(self):
+        """С ?format=json комментарии отдаются в JSON с курсором."""
+        data = self.client.get(self.url, {"format": "json"}).json()
+        self.assertEqual(len(data["results"]), COMMENTS_PER_PAGE)
+        self.assertEqual(data["results"][0]["author"], "author")
+        data = self.client.get(
+            self.url, {"format": "json", "cursor": data["next"]}
+        ).json()
+        self.assertEqual(
+            [comment["id"] for comment in data["results"]],
+            [comment.pk for comment in self.comments[COMMENTS_PER_PAGE:]],
+        )
+        self.assertIsNone(data["next"])
+
+    def test_json_keeps_hole_markers_as_text(self):
+        """Маркеры {% hole %} в тексте комментария не разворачиваются
+        в JSON и не ломают его."""
+        markers = [
+            "<!--hole:AAAA-->",
+            "<!--hole:{}-->".format(base64.urlsafe_b64encode(
+                b'["includes/header.html", {}]'
+            ).decode()),
+        ]
+        post = Post.objects.create(text="Пост", author=self.author)
+        for text in markers:
+            Comment.objects.create(post=post, author=self.author, text=text)
+        url = reverse("posts:post_comments", args=[post.pk])
+        for _ in range(2):
+            data = self.client.get(url, {"format": "json"}).json()
+            self.assertEqual(
+                [comment["text"] for comment in data["results"]], markers
+            )
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор — 404."""
+        response = self.client.get(self.url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -297,6 +632,22 @@ class FollowViewsTest(TestCase):
         self.assertEqual(follow_obj.author_id, self.user.pk)
         self.assertEqual(follow_obj.user_id, self.another_user.pk)
 
+    def test_follow_buttons_on_feeds(self):
+        """Кнопки подписки в ленте отражают подписки пользователя
+        и обновляются после подписки."""
+        cache.clear()
+        url = reverse("posts:index")
+        follow_url = reverse("posts:profile_follow", args=[self.user])
+        unfollow_url = reverse("posts:profile_unfollow", args=[self.user])
+        response = self.another_auth_user.get(url)
+        self.assertContains(response, follow_url)
+        self.assertNotContains(response, unfollow_url)
+        self.assertNotContains(self.authorized_author.get(url), follow_url)
+        self.another_auth_user.get(follow_url)
+        response = self.another_auth_user.get(url)
+        self.assertContains(response, unfollow_url)
+        self.assertNotContains(response, follow_url)
+
     def test_authorized_user_unfollow(self):
         """Авторизованный пользователь может отписаться от автора поста."""
         Follow.objects.create(author=self.user, user=self.another_user)
@@ -330,3 +681,374 @@ class FollowViewsTest(TestCase):
             .object_list
         )
         self.assertNotIn(self.post, follow_list)
+
+    def test_follow_feed_entries_maintained(self):
+        """Лента подписок заполняется при подписке и публикации
+        и очищается при отписке."""
+        Follow.objects.create(author=self.user, user=self.another_user)
+        new_post = Post.objects.create(text="Новый пост", author=self.user)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.another_user).values_list("post_id", flat=True)),
+            {self.post.pk, new_post.pk},
+        )
+        self.another_auth_user.get(
+            reverse(
+                "posts:profile_unfollow",
+                kwargs={"username": self.user.username},
+            )
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.another_user).exists()
+        )
+
+    def test_follow_feed_count_after_delete(self):
+        """После удаления постов число страниц ленты подписок
+        пересчитывается, а не берётся из кеша."""
+        cache.clear()
+        Follow.objects.create(author=self.user, user=self.another_user)
+        posts = [
+            Post.objects.create(text=f"Пост #{i}", author=self.user)
+            for i in range(10)
+        ]
+        url = reverse("posts:follow_index")
+        page_obj = self.another_auth_user.get(url).context["page_obj"]
+        self.assertEqual(page_obj.paginator.num_pages, 2)
+        for post in posts[:2]:
+            post.delete()
+        page_obj = self.another_auth_user.get(url).context["page_obj"]
+        self.assertEqual(page_obj.paginator.num_pages, 1)
+
+    @override_settings(FOLLOW_FEED_ENGINE="merge")
+    def test_follow_feed_merge_engine(self):
+        """Движок merge собирает ленту из лент авторов без FeedEntry."""
+        cache.clear()
+        third_user = User.objects.create(username="third_user")
+        Follow.objects.create(author=self.user, user=self.another_user)
+        Follow.objects.create(author=third_user, user=self.another_user)
+        third_post = Post.objects.create(text="Третий", author=third_user)
+        self.assertFalse(FeedEntry.objects.exists())
+        follow_list = self.another_auth_user.get(
+            reverse("posts:follow_index")
+        ).context["page_obj"].object_list
+        self.assertEqual(follow_list, [third_post, self.post])
+        newest_post = Post.objects.create(text="Новый", author=self.user)
+        follow_list = self.another_auth_user.get(
+            reverse("posts:follow_index")
+        ).context["page_obj"].object_list
+        self.assertEqual(follow_list, [newest_post, third_post, self.post])
+
+    @override_settings(FOLLOW_FEED_ENGINE="merge")
+    def test_follow_feed_merge_engine_pages(self):
+        """Движок merge листает ленту без подсчёта числа постов."""
+        cache.clear()
+        Follow.objects.create(author=self.user, user=self.another_user)
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=self.user)
+            for i in range(POSTS_PER_PAGE)
+        )
+        url = reverse("posts:follow_index")
+        page_obj = self.another_auth_user.get(url).context["page_obj"]
+        self.assertEqual(len(page_obj.object_list), POSTS_PER_PAGE)
+        self.assertTrue(page_obj.has_next())
+        self.assertIsNone(page_obj.paginator.num_pages)
+        page_obj = self.another_auth_user.get(
+            url, {"page": 2}
+        ).context["page_obj"]
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj.object_list), 1)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+
+class ObjectLookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(title="Группа", slug="group")
+
+    def table_queries(self, url, data, table):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        return response.status_code, len(
+            [q for q in queries if f'FROM "{table}"' in q["sql"]]
+        )
+
+    def test_group_and_author_lookups_cached(self):
+        """Сообщество и автор берутся из кеша без запросов к БД."""
+        cases = {
+            reverse("posts:group_list", args=["group"]): "posts_group",
+            reverse("posts:profile", args=["author"]): "auth_user",
+        }
+        for url, table in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.table_queries(url, {"page": 1}, table),
+                    (HTTPStatus.OK, 1),
+                )
+                self.assertEqual(
+                    self.table_queries(url, {"page": 2}, table),
+                    (HTTPStatus.OK, 0),
+                )
+
+    def test_cached_author_without_private_fields(self):
+        """В кеш попадают только выводимые поля автора."""
+        for _ in range(2):
+            author = lookups.get_author_or_404("author")
+        self.assertEqual(author.username, "author")
+        self.assertEqual(author.stats.posts_count, 0)
+        self.assertTrue(
+            {"password", "email", "last_login"}
+            <= author.get_deferred_fields()
+        )
+
+    def test_missing_group_cached_until_created(self):
+        """Отсутствие сообщества кешируется до его создания."""
+        url = reverse("posts:group_list", args=["new"])
+        self.assertEqual(
+            self.table_queries(url, {}, "posts_group"),
+            (HTTPStatus.NOT_FOUND, 1),
+        )
+        self.assertEqual(
+            self.table_queries(url, {}, "posts_group"),
+            (HTTPStatus.NOT_FOUND, 0),
+        )
+        Group.objects.create(title="Новая группа", slug="new")
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.OK
+        )
+
+    def test_renamed_objects_invalidated(self):
+        """После переименования старый адрес перестаёт открываться."""
+        old_urls = [
+            reverse("posts:group_list", args=["group"]),
+            reverse("posts:profile", args=["author"]),
+        ]
+        for url in old_urls:
+            self.client.get(url)
+        self.group.slug = "renamed"
+        self.group.save()
+        author = User.objects.get(username="author")
+        author.username = "writer"
+        author.save()
+        for url in old_urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
+        self.assertEqual(
+            self.client.get(
+                reverse("posts:profile", args=["writer"])
+            ).status_code,
+            HTTPStatus.OK,
+        )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title="Группа", slug="test-slug")
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(
+            text="Пост", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ]
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag или Last-Modified получает 304
+        без обращения к лентам."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("Last-Modified", response)
+                for headers in (
+                    {"HTTP_IF_NONE_MATCH": response["ETag"]},
+                    {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]},
+                ):
+                    with CaptureQueriesContext(connection) as queries:
+                        repeated = self.client.get(url, **headers)
+                    self.assertEqual(
+                        repeated.status_code, HTTPStatus.NOT_MODIFIED
+                    )
+                    self.assertLessEqual(len(queries), 1)
+
+    def test_etag_changes(self):
+        """ETag меняется после нового поста и различается у анонима
+        и авторизованного пользователя."""
+        url = reverse("posts:index")
+        etag = self.client.get(url)["ETag"]
+        authorized = self.authorized_client.get(url)
+        self.assertNotEqual(etag, authorized["ETag"])
+        self.assertNotIn("Last-Modified", authorized)
+        Post.objects.create(text="Новый пост", author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_changes_etag(self):
+        """После подписки страницы с кнопками подписки отдаются заново."""
+        url = reverse("posts:profile", args=[self.author.username])
+        etag = self.authorized_client.get(url)["ETag"]
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, "Отписаться")
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов к БД на страницу не зависит от числа записей."""
+
+    ANONYMOUS_BUDGETS = {
+        # На холодном кеше к числу постов добавляется проверка статистики.
+        "posts:index": 3,
+        "posts:group_list": 3,
+        "posts:profile": 3,
+        "posts:post_detail": 3,
+    }
+    # Сессия, пользователь и множество его подписок.
+    AUTHORIZED_EXTRA = 3
+    # Рекомендации авторов в ленте подписок.
+    SUGGESTIONS_EXTRA = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title="Группа", slug="test-slug")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(
+            text="Пост", author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def add_rows(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username=f"author_{i}")
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(text=f"Пост #{i}", author=author,
+                                group=self.group)
+            Post.objects.create(text=f"Пост #{i}", author=self.author,
+                                group=self.group)
+            Comment.objects.create(post=self.post, author=author,
+                                   text=f"Комментарий #{i}")
+
+    def urls(self):
+        kwargs = {
+            "posts:index": {},
+            "posts:group_list": {"slug": self.group.slug},
+            "posts:profile": {"username": self.author.username},
+            "posts:post_detail": {"post_id": self.post.pk},
+        }
+        return {
+            name: reverse(name, kwargs=kwargs[name])
+            for name in self.ANONYMOUS_BUDGETS
+        }
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        return len(queries)
+
+    def test_query_budgets(self):
+        """Страницы укладываются в бюджет запросов
+        при любом размере страницы."""
+        authorized_budgets = {
+            name: budget + self.AUTHORIZED_EXTRA
+            for name, budget in self.ANONYMOUS_BUDGETS.items()
+        }
+        follow_url = reverse("posts:follow_index")
+        for rows in (0, 9):
+            self.add_rows(rows)
+            for name, url in self.urls().items():
+                with self.subTest(url=url, rows=rows):
+                    self.assertLessEqual(
+                        self.count_queries(self.client, url),
+                        self.ANONYMOUS_BUDGETS[name],
+                    )
+                    self.assertLessEqual(
+                        self.count_queries(self.authorized_client, url),
+                        authorized_budgets[name],
+                    )
+            with self.subTest(url=follow_url, rows=rows):
+                self.assertLessEqual(
+                    self.count_queries(self.authorized_client, follow_url),
+                    1 + self.AUTHORIZED_EXTRA + self.SUGGESTIONS_EXTRA,
+                )
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN из SQLite")
+class QueryPlanTests(TestCase):
+    """Запросы лент идут по индексам, без сортировки во временном B-tree."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title="Группа", slug="test-slug")
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f"Пост #{i}", author=cls.author, group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Текст")
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        """Каждый запрос к posts_* использует индекс."""
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": "author"}),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+            reverse("posts:post_comments", kwargs={"post_id": self.post.pk}),
+            reverse("posts:follow_index"),
+        ]
+        for url in urls:
+            page_obj = self.authorized_client.get(url).context.get("page_obj")
+            cursors = [page_obj.next_cursor] if page_obj else []
+            with CaptureQueriesContext(connection) as queries:
+                # Холодный кеш: проверяются и запросы, которые кешируются.
+                cache.clear()
+                self.authorized_client.get(url)
+                for cursor in cursors:
+                    cache.clear()
+                    self.authorized_client.get(url, {"cursor": cursor})
+            for query in queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or "posts_" not in sql:
+                    continue
+                for step in self.explain(sql):
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertNotIn("TEMP B-TREE", step)
+                        if step.startswith("SCAN"):
+                            self.assertIn("INDEX", step)
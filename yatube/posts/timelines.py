@@ -0,0 +1,156 @@
+"""Движки ленты подписок.
+
+``inbox`` — лента материализуется при записи (fan-out on write): новый
+пост раскладывается в FeedEntry всех подписчиков автора, а чтение ленты —
+это один проход по индексу (user, -pub_date).
+
+``merge`` — лента собирается при чтении (fan-out on read): для каждого
+автора в кеше хранится ограниченный список последних постов, лента
+подписчика получается k-way слиянием этих списков через heapq,
+которое останавливается на конце запрошенной страницы.
+
+Движок выбирается настройкой FOLLOW_FEED_ENGINE; после смены движка
+на ``inbox`` ленты нужно пересобрать командой rebuild_follow_feed.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import FeedEntry, Follow, Post
+from .utils import feed_count, get_id_page_context, get_page_context
+
+ENGINE_INBOX = 'inbox'
+ENGINE_MERGE = 'merge'
+
+BATCH_SIZE = 500
+
+AUTHOR_TIMELINE_KEY = 'posts:author_timeline:{}'
+
+
+def uses_inbox():
+    return settings.FOLLOW_FEED_ENGINE == ENGINE_INBOX
+
+
+def _bulk_create(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def follower_ids(author_id):
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора,
+    возвращает список id подписчиков."""
+    followers = follower_ids(post.author_id)
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            author_id=post.author_id,
+            post_id=post.pk,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers
+    )
+    return followers
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту пользователя постами автора после подписки."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            author_id=author_id,
+            post_id=post_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Удаляет посты автора из ленты пользователя после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Пересобирает ленты всех пользователей по таблице подписок."""
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+def get_follow_feed(user):
+    """Посты ленты подписок; сортировать нужно по ``feed_date``
+    и ``feed_post``, чтобы пройти по индексу FeedEntry без сортировки."""
+    return Post.objects.filter(feed_entries__user=user).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post'),
+    ).select_related('author', 'group')
+
+
+def _author_timeline_key(author_id):
+    return AUTHOR_TIMELINE_KEY.format(author_id)
+
+
+def invalidate_author_timeline(author_id):
+    cache.delete(_author_timeline_key(author_id))
+
+
+def get_author_timelines(author_ids):
+    """Списки (pub_date, pk) последних постов авторов, от новых к старым."""
+    keys = {_author_timeline_key(pk): pk for pk in author_ids}
+    found = cache.get_many(keys)
+    timelines = list(found.values())
+    for key, author_id in keys.items():
+        if key in found:
+            continue
+        timeline = list(
+            Post.objects.filter(author_id=author_id).order_by(
+                '-pub_date', '-pk'
+            ).values_list('pub_date', 'pk')[:settings.AUTHOR_TIMELINE_SIZE]
+        )
+        cache.set(key, timeline, None)
+        timelines.append(timeline)
+    return timelines
+
+
+def get_merged_page_context(request):
+    author_ids = Follow.objects.filter(
+        user=request.user
+    ).values_list('author_id', flat=True)
+    merged = heapq.merge(*get_author_timelines(author_ids), reverse=True)
+    return get_id_page_context(
+        request,
+        Post.objects.select_related('author', 'group'),
+        (pk for _, pk in merged),
+    )
+
+
+def get_follow_page_context(request):
+    if uses_inbox():
+        return get_page_context(
+            request,
+            get_follow_feed(request.user),
+            key='-feed_date',
+            tiebreak='feed_post',
+            count=feed_count(
+                FeedEntry.objects.filter(user=request.user).count,
+                name=f'follow:{request.user.pk}',
+                scopes=[f'feed:{request.user.pk}'],
+            ),
+        )
+    return get_merged_page_context(request)
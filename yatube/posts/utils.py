@@ -1,8 +1,396 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from collections.abc import Iterator
+from itertools import islice
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-def get_page_context(request, posts):
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return {'page_obj': page_obj}
+from core.caching import get_versions
+from core.thumbnails import prefetch_thumbnails
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+
+PAGE_WINDOW_ON_EACH_SIDE = 2
+PAGE_WINDOW_ON_ENDS = 1
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_NONE = 'none'
+
+COUNT_KEY = 'posts:count:{}'
+
+
+class EstimatedCount(int):
+    """Число объектов по статистике СУБД: годится для навигации,
+    но не для проверки границ страниц — статистика отстаёт от
+    растущей таблицы."""
+
+
+class CursorPage(Page):
+    """Страница, полученная по курсору или без подсчёта числа объектов:
+    число страниц неизвестно, наличие соседних страниц определяется
+    без COUNT(*). У страниц по курсору неизвестен и номер."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous,
+                 number=None):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return None if self.number is None else self.number + 1
+
+    def previous_page_number(self):
+        return None if self.number is None else self.number - 1
+
+
+class CursorPaginator(Paginator):
+    """Paginator с keyset-пагинацией по паре (key, pk).
+
+    Объектами страниц могут быть и модели, и словари из ``.values()``.
+
+    Номерные страницы (``?page=``) работают как у обычного Paginator,
+    а страницы по курсору (``?cursor=``) выбираются условием
+    ``WHERE (key, pk) < (value, id) LIMIT per_page + 1`` и не зависят
+    от глубины листания. Условие записано как
+    ``key <= value AND (key < value OR pk < id)``, чтобы СУБД могла
+    начать поиск по индексу (key, pk) сразу с нужной границы.
+    """
+
+    def __init__(self, object_list, per_page, key='-pub_date',
+                 tiebreak='pk', count=None, **kwargs):
+        self._count = count
+        self.key = key.lstrip('-')
+        self.tiebreak = tiebreak
+        self.descending = key.startswith('-')
+        prefix = '-' if self.descending else ''
+        super().__init__(
+            object_list.order_by(prefix + self.key, prefix + tiebreak),
+            per_page,
+            **kwargs
+        )
+
+    @cached_property
+    def count(self):
+        """Число объектов; ``count`` из конструктора (число или функция)
+        позволяет подставить запрос дешевле, чем COUNT(*) по ленте.
+        Функция может вернуть None — тогда число не считается вовсе,
+        а номерные страницы знают только о наличии соседних. Оценка
+        (EstimatedCount) только отображается в навигации, а страницы
+        выбираются так же, как без подсчёта."""
+        if self._count is None:
+            return Paginator.count.func(self)
+        return self._count() if callable(self._count) else self._count
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return Paginator.num_pages.func(self)
+
+    @property
+    def exact_count(self):
+        return (
+            self.count is not None
+            and not isinstance(self.count, EstimatedCount)
+        )
+
+    def get_page(self, number):
+        if self.exact_count:
+            return super().get_page(number)
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self.page(number)
+
+    def page(self, number):
+        if not self.exact_count:
+            return self.uncounted_page(number)
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        self._set_cursors(page)
+        return page
+
+    def uncounted_page(self, number):
+        """Номерная страница без COUNT(*): выбирается ``per_page + 1``
+        строк, лишняя строка означает, что следующая страница есть."""
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        page = CursorPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+            number=number,
+        )
+        self._set_cursors(page)
+        return page
+
+    def keyset_queryset(self, direction, value, pk):
+        after = (direction == CURSOR_NEXT) != self.descending
+        lookup = 'gt' if after else 'lt'
+        condition = Q(**{f'{self.key}__{lookup}e': value}) & (
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{f'{self.tiebreak}__{lookup}': pk})
+        )
+        prefix = '' if after else '-'
+        return self.object_list.filter(condition).order_by(
+            prefix + self.key, prefix + self.tiebreak
+        )[:self.per_page + 1]
+
+    def cursor_page(self, cursor):
+        """Страница по курсору; номер страницы берётся из курсора,
+        если он там есть, чтобы навигация по номерам не терялась."""
+        direction, value, pk, number = self.decode_cursor(cursor)
+        rows = list(self.keyset_queryset(direction, value, pk))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            # Устаревший курсор (записи удалены) или курсор за краем
+            # ленты: соседних страниц от пустой страницы не найти.
+            page = CursorPage(rows, self, has_next=False, has_previous=False)
+        elif direction == CURSOR_PREVIOUS:
+            rows.reverse()
+            if not has_more:
+                number = 1
+            page = CursorPage(
+                rows, self, has_next=True, has_previous=has_more,
+                number=number,
+            )
+        else:
+            page = CursorPage(
+                rows, self, has_next=has_more, has_previous=True,
+                number=number,
+            )
+        self._set_cursors(page)
+        return page
+
+    @staticmethod
+    def _value(obj, name):
+        return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+    def encode_cursor(self, direction, obj, number=None):
+        """Курсор на страницу после (до) объекта ``obj``; ``number`` —
+        номер этой страницы, если он известен."""
+        parts = [
+            direction,
+            self._value(obj, self.key).isoformat(),
+            self._value(obj, self.tiebreak),
+        ]
+        if number:
+            parts.append(number)
+        raw = '|'.join(map(str, parts)).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            parts = raw.decode().split('|')
+            if len(parts) == 3:
+                parts.append(None)
+            direction, value, pk, number = parts
+            value = parse_datetime(value)
+            pk = int(pk)
+            number = None if number is None else int(number)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidPage('Некорректный курсор')
+        if value is None or direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+            raise InvalidPage('Некорректный курсор')
+        if number is not None and number < 1:
+            raise InvalidPage('Некорректный курсор')
+        return direction, value, pk, number
+
+    def _set_cursors(self, page):
+        rows = page.object_list
+        page.next_cursor = page.previous_cursor = None
+        if not rows:
+            return
+        number = page.number
+        page.previous_cursor = self.encode_cursor(
+            CURSOR_PREVIOUS, rows[0], number - 1 if number else None
+        )
+        page.next_cursor = self.encode_cursor(
+            CURSOR_NEXT, rows[-1], number + 1 if number else None
+        )
+
+
+class IteratorPaginator(Paginator):
+    """Paginator по итератору без подсчёта объектов: для страницы
+    из итератора читаются объекты только до её конца и ещё один,
+    лишний объект означает, что следующая страница есть."""
+
+    count = None
+    num_pages = None
+
+    def get_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self.page(number)
+
+    def page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(islice(
+            self.object_list, bottom, bottom + self.per_page + 1
+        ))
+        return CursorPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+            number=number,
+        )
+
+
+def get_page_window(page, on_each_side=PAGE_WINDOW_ON_EACH_SIDE,
+                    on_ends=PAGE_WINDOW_ON_ENDS):
+    """Номера страниц для навигации: первые и последние ``on_ends``
+    и ``on_each_side`` вокруг текущей; None обозначает пропуск."""
+    if not page.number or page.paginator.count is None:
+        return []
+    number = page.number
+    # Число страниц может быть оценкой меньше настоящего.
+    num_pages = max(page.paginator.num_pages, number + page.has_next())
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    if number > on_each_side + on_ends + 2:
+        window = [*range(1, on_ends + 1), None]
+        window += range(number - on_each_side, number + 1)
+    else:
+        window = list(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window += range(number + 1, number + on_each_side + 1)
+        window += [None, *range(num_pages - on_ends + 1, num_pages + 1)]
+    else:
+        window += range(number + 1, num_pages + 1)
+    return window
+
+
+def estimate_rows(model):
+    """Оценка числа строк таблицы по статистике планировщика СУБД
+    (sqlite_stat1 после ANALYZE, pg_class.reltuples в PostgreSQL);
+    None, если статистики нет."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    rows = int(float(str(row[0]).split()[0]))
+    return rows if rows > 0 else None
+
+
+def feed_count(count, name=None, scopes=(), estimate=None):
+    """Функция подсчёта объектов ленты для CursorPaginator.
+
+    Режим задаёт настройка PAGINATOR_COUNT: ``exact`` — ``count`` на
+    каждый запрос; ``cached`` — результат ``count`` кешируется под
+    именем ленты ``name`` до смены счётчиков поколений ``scopes``,
+    а если ``estimate`` оценивает ленту больше чем в
+    PAGINATOR_ESTIMATE_THRESHOLD строк, вместо подсчёта берётся оценка
+    (EstimatedCount); ``none`` — число не считается, у страниц есть
+    только ссылки «Предыдущая» и «Следующая». Без ``name`` результат
+    не кешируется: так передаются уже денормализованные счётчики.
+    """
+    mode = settings.PAGINATOR_COUNT
+    if mode == COUNT_NONE:
+        return lambda: None
+    if mode == COUNT_EXACT or name is None:
+        return count
+
+    def cached_count():
+        key = COUNT_KEY.format(
+            ':'.join(map(str, [name, *get_versions(*scopes)]))
+        )
+        rows = cache.get(key)
+        if rows is None:
+            rows = estimate() if estimate is not None else None
+            if rows and rows >= settings.PAGINATOR_ESTIMATE_THRESHOLD:
+                rows = EstimatedCount(rows)
+            else:
+                rows = count() if callable(count) else count
+            cache.set(key, rows, settings.PAGE_CACHE_TIMEOUT)
+        return rows
+
+    return cached_count
+
+
+def get_page_context(request, posts, key='-pub_date', tiebreak='pk',
+                     count=None):
+    paginator = CursorPaginator(
+        posts, POSTS_PER_PAGE, key=key, tiebreak=tiebreak, count=count
+    )
+    page_obj = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            page_obj = paginator.cursor_page(cursor)
+        except InvalidPage:
+            pass
+    if page_obj is None or not page_obj.object_list:
+        page_obj = paginator.get_page(request.GET.get('page'))
+    prefetch_thumbnails([post.image for post in page_obj.object_list])
+    return {'page_obj': page_obj, 'page_window': get_page_window(page_obj)}
+
+
+def get_id_page_context(request, posts, ids):
+    """Страница по готовому списку id постов: Paginator листает список,
+    а посты страницы загружаются из ``posts`` одним запросом. Итератор
+    ``ids`` читается только до конца запрошенной страницы."""
+    if isinstance(ids, Iterator):
+        paginator = IteratorPaginator(ids, POSTS_PER_PAGE)
+    else:
+        paginator = Paginator(ids, POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    found = posts.in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        found[pk] for pk in page_obj.object_list if pk in found
+    ]
+    prefetch_thumbnails([post.image for post in page_obj.object_list])
+    return {'page_obj': page_obj, 'page_window': get_page_window(page_obj)}
+
+
+def get_comment_page(comments, cursor=None):
+    """Страница комментариев от старых к новым: первая без курсора,
+    следующие — по курсору (created, pk) без подсчёта комментариев."""
+    paginator = CursorPaginator(
+        comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        key='created',
+        count=lambda: None,
+    )
+    if cursor:
+        return paginator.cursor_page(cursor)
+    return paginator.page(1)
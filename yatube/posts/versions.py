@@ -0,0 +1,149 @@
+"""Счётчики поколений для кеша лент и страниц постов.
+
+Области (scope) счётчиков:
+``posts`` — любой пост или комментарий (главная страница);
+``groups`` — любое сообщество (названия групп видны во всех лентах);
+``group:<slug>``, ``author:<username>``, ``post:<id>`` — страницы
+конкретного сообщества, профиля и поста;
+``feed:<user_id>`` — лента подписок пользователя (число постов в ней);
+``authors`` — смена имени любого пользователя (имена и ссылки на
+профили авторов в карточках постов, API и лентах RSS/Atom).
+
+Функции ``*_key`` дают части ключей кеша страниц (cache_shell),
+``*_scopes`` — области для ETag и Last-Modified (conditional_page).
+"""
+from core.caching import bump_versions, get_versions
+
+from .models import Group, Post, User
+
+# Поля пользователя, которые выводятся в карточках постов его именем.
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def index_key(request):
+    return get_versions('posts', 'groups', 'authors')
+
+
+def group_key(request, slug):
+    return get_versions(f'group:{slug}', 'groups', 'authors')
+
+
+def profile_key(request, username):
+    return get_versions(f'author:{username}', 'groups')
+
+
+def _post_scopes(request, post_id):
+    """Области страницы поста; автор запрашивается один раз на запрос."""
+    if not hasattr(request, '_post_author'):
+        request._post_author = Post.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True
+        ).first()
+    if request._post_author is None:
+        return None
+    return [f'post:{post_id}', f'author:{request._post_author}', 'groups']
+
+
+def post_key(request, post_id):
+    """Страница поста кешируется только для анонимов: у авторизованных
+    на ней форма комментария с CSRF-токеном и кнопка редактирования."""
+    if request.user.is_authenticated:
+        return None
+    scopes = _post_scopes(request, post_id)
+    return None if scopes is None else get_versions(*scopes)
+
+
+def _user_scopes(request):
+    """Области пользовательских фрагментов страницы: шапка с именем,
+    кнопки подписки и рекомендации авторов."""
+    user = request.user
+    if not user.is_authenticated:
+        return []
+    return [f'author:{user.username}', f'feed:{user.pk}', 'suggestions']
+
+
+def index_scopes(request):
+    return ['posts', 'groups', 'authors', *_user_scopes(request)]
+
+
+def group_scopes(request, slug):
+    return [f'group:{slug}', 'groups', 'authors', *_user_scopes(request)]
+
+
+def profile_scopes(request, username):
+    return [f'author:{username}', 'groups', *_user_scopes(request)]
+
+
+def post_scopes(request, post_id):
+    scopes = _post_scopes(request, post_id)
+    return None if scopes is None else [*scopes, *_user_scopes(request)]
+
+
+def comments_key(request, post_id):
+    return get_versions(f'post:{post_id}')
+
+
+def _author_scopes(*user_ids):
+    return [
+        f'author:{username}' for username in User.objects.filter(
+            pk__in=user_ids
+        ).values_list('username', flat=True)
+    ]
+
+
+def _group_scopes(*group_ids):
+    return [
+        f'group:{slug}' for slug in Group.objects.filter(
+            pk__in=[pk for pk in group_ids if pk is not None]
+        ).values_list('slug', flat=True)
+    ]
+
+
+def bump_post(post_id, author_id, *group_ids):
+    bump_versions(
+        'posts',
+        f'post:{post_id}',
+        *_author_scopes(author_id),
+        *_group_scopes(*group_ids),
+    )
+
+
+def bump_comment(comment):
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        bump_post(comment.post_id, post['author_id'], post['group_id'])
+
+
+def bump_follow(follow):
+    bump_versions(
+        f'feed:{follow.user_id}',
+        *_author_scopes(follow.user_id, follow.author_id),
+    )
+
+
+def bump_feeds(user_ids):
+    bump_versions(*(f'feed:{pk}' for pk in user_ids))
+
+
+def bump_group(group):
+    previous_slug = getattr(group, '_previous_slug', None)
+    bump_versions(
+        'groups',
+        f'group:{group.slug}',
+        *([f'group:{previous_slug}'] if previous_slug else []),
+    )
+
+
+def bump_author(user):
+    """Страницы автора; при смене имени — и все страницы с карточками
+    его постов, при смене username — и страницы под старым адресом."""
+    previous = getattr(user, '_previous_names', None) or {}
+    scopes = [f'author:{user.username}']
+    if any(
+        previous[field] != getattr(user, field) for field in previous
+    ):
+        scopes.append('authors')
+    if previous.get('username', user.username) != user.username:
+        scopes.append(f'author:{previous["username"]}')
+    bump_versions(*scopes)
@@ -1,49 +1,148 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from core import thumbnails
+from core.caching import cache_shell, conditional_page
+
+from . import autocomplete, lookups, search, timelines, versions
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import get_page_context
+from .models import Comment, Follow, Post
+from .utils import (estimate_rows, feed_count, get_comment_page,
+                    get_id_page_context, get_page_context)
 
 
-@cache_page(20)
+@conditional_page(versions.index_scopes)
+@cache_shell(settings.PAGE_CACHE_TIMEOUT, key_func=versions.index_key)
 def index(request):
-    context = get_page_context(request, Post.objects.all())
+    context = get_page_context(
+        request,
+        Post.objects.select_related('author', 'group'),
+        count=feed_count(
+            Post.objects.count,
+            name='index',
+            scopes=['posts'],
+            estimate=lambda: estimate_rows(Post),
+        ),
+    )
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(versions.group_scopes)
+@cache_shell(settings.PAGE_CACHE_TIMEOUT, key_func=versions.group_key)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = lookups.get_group_or_404(slug)
     context = {'group': group}
-    context.update(get_page_context(request, group.posts.all()))
+    context.update(get_page_context(
+        request,
+        group.posts.select_related('author'),
+        count=feed_count(group.posts_count),
+    ))
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(versions.profile_scopes)
+@cache_shell(settings.PAGE_CACHE_TIMEOUT, key_func=versions.profile_key)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated
-    if following:
-        following = author.following.filter(user=request.user).exists()
-    context = {'author': author,
-               'following': following
-               }
-    context.update(get_page_context(request, author.posts.all()))
+    author = lookups.get_author_or_404(username)
+    context = {'author': author}
+    stats = getattr(author, 'stats', None)
+    context.update(get_page_context(
+        request,
+        author.posts.select_related('group'),
+        count=feed_count(stats.posts_count if stats else author.posts.count),
+    ))
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(versions.post_scopes)
+@cache_shell(settings.PAGE_CACHE_TIMEOUT, key_func=versions.post_key)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments_page = get_comment_page(post.comments.all())
     context = {'post': post,
                'username': request.user,
-               'comments': comments,
+               'comments': comments_page.object_list,
+               'comments_page': comments_page,
                'form': CommentForm(),
                }
     return render(request, 'posts/post_detail.html', context)
 
 
+def _get_comments_page(request, post_id):
+    try:
+        return get_comment_page(
+            Comment.objects.filter(post_id=post_id),
+            request.GET.get('cursor'),
+        )
+    except InvalidPage:
+        raise Http404('Некорректный курсор')
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев поста: HTML-фрагмент для
+    подгрузки на странице поста или JSON при ``?format=json``.
+
+    JSON отдаётся мимо cache_shell: текст комментариев в нём не
+    экранирован, и маркеры {% hole %} в нём разворачиваться не должны."""
+    if request.GET.get('format') != 'json':
+        return _post_comments_fragment(request, post_id)
+    comments_page = _get_comments_page(request, post_id)
+    return JsonResponse({
+        'results': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            }
+            for comment in comments_page
+        ],
+        'next': (
+            comments_page.next_cursor
+            if comments_page.has_next() else None
+        ),
+    })
+
+
+@cache_shell(settings.PAGE_CACHE_TIMEOUT, key_func=versions.comments_key)
+def _post_comments_fragment(request, post_id):
+    comments_page = _get_comments_page(request, post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    context = get_id_page_context(
+        request,
+        Post.objects.select_related('author', 'group'),
+        search.search_ids(query),
+    )
+    for post in context['page_obj']:
+        post.highlighted_text = search.highlight(post.text, query)
+    context.update({
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    })
+    return render(request, 'posts/search.html', context)
+
+
+def author_autocomplete(request):
+    return JsonResponse(
+        {'results': autocomplete.complete(request.GET.get('q', ''))}
+    )
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -54,6 +153,7 @@ def post_create(request):
         post = form.save(False)
         post.author = request.user
         post.save()
+        thumbnails.pregenerate(post.image)
         return redirect('posts:profile', request.user.username)
     context = {
         'form': form,
@@ -73,6 +173,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.pregenerate(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -96,15 +198,13 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    context = get_page_context(request, Post.objects.filter(
-        author__following__user=request.user)
-    )
+    context = timelines.get_follow_page_context(request)
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_author_or_404(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', author)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -159,3 +160,77 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Движок ленты подписок: 'inbox' (fan-out on write) или 'merge'
+# (fan-out on read, k-way слияние кешированных лент авторов).
+FOLLOW_FEED_ENGINE = 'inbox'
+
+# Сколько последних постов автора хранится в кеше для движка 'merge'.
+AUTHOR_TIMELINE_SIZE = 200
+
+# Время жизни закешированных страниц лент и постов: ключи включают
+# счётчики поколений, поэтому после записи страницы обновляются сразу.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Подсчёт числа постов в лентах для пагинации: 'exact' (COUNT(*) на каждый
+# запрос), 'cached' (кеш до изменения ленты, оценка для больших таблиц)
+# или 'none' (без подсчёта, только ссылки на соседние страницы).
+PAGINATOR_COUNT = 'cached'
+
+# С какого размера таблицы в режиме 'cached' число постов берётся
+# из статистики СУБД, а не считается COUNT(*).
+PAGINATOR_ESTIMATE_THRESHOLD = 100_000
+
+# Варианты миниатюр изображений постов: имя -> (геометрия, опции sorl).
+THUMBNAIL_VARIANTS = {
+    'card': ('960', {'crop': 'center', 'upscale': True}),
+}
+
+# Меньшие ширины каждого варианта для srcset и дополнительные форматы
+# для <picture>; форматы, которые не умеют сохранять установленные Pillow
+# и sorl-thumbnail, пропускаются.
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_FORMATS = ('AVIF', 'WEBP')
+
+# Backend sorl-thumbnail с поиском готовых миниатюр без генерации
+# и key-value хранилище с пакетным чтением миниатюр страницы.
+THUMBNAIL_BACKEND = 'core.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'core.thumbnails.KVStore'
+
+# Число потоков для фоновой генерации миниатюр; 0 — генерировать
+# в потоке запроса после отправки ответа. В тестах пул выключен:
+# фоновый поток писал бы миниатюры уже после того, как тест удалил
+# свой временный MEDIA_ROOT.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
+# Ограничения загружаемых изображений: число пикселей проверяется
+# по заголовку до декодирования, большая сторона уменьшается до
+# IMAGE_MAX_SIDE при пересохранении.
+IMAGE_MAX_PIXELS = 24_000_000
+IMAGE_MAX_SIDE = 2560
+
+# Движок поиска по постам: 'fts5' (таблица SQLite FTS5, при её отсутствии —
+# индекс в памяти) или 'python' (всегда индекс в памяти процесса).
+SEARCH_ENGINE = 'fts5'
+
+# Сколько лучших результатов поиска доступно для листания.
+SEARCH_MAX_RESULTS = 1000
+
+# Сколько авторов возвращает автодополнение.
+AUTOCOMPLETE_LIMIT = 10
+
+# Время жизни закешированных сообществ и авторов (ключи включают счётчики
+# поколений) и отметок об их отсутствии.
+OBJECT_CACHE_TIMEOUT = 60 * 60 * 6
+OBJECT_CACHE_MISS_TIMEOUT = 60
+
+# Рекомендации авторов: сколько лучших кандидатов на пользователя хранится
+# в таблице, сколько показывается и сколько соседей одной вершины графа
+# подписок учитывается при расчёте.
+SUGGESTIONS_STORED = 20
+SUGGESTIONS_LIMIT = 5
+SUGGESTIONS_FANOUT_LIMIT = 100
+
+# Сколько последних постов попадает в RSS/Atom ленты.
+FEED_ITEMS = 50